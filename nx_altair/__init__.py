@@ -1,3 +1,7 @@
 from .draw_altair import (draw_networkx,
                           draw_networkx_nodes,
-                          draw_networkx_edges)
+                          draw_networkx_edges,
+                          draw_networkx_density,
+                          draw_networkx_bundles,
+                          draw_networkx_matrix)
+from .batch import draw_many
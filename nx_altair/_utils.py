@@ -16,6 +16,21 @@ def is_arraylike(obj):
     return False
 
 
+def infer_vegalite_type(series):
+    """Return the Vega-Lite type shorthand ('Q', 'T', 'O' or 'N') matching
+    the dtype of a pandas.Series.
+    """
+    if pd.api.types.is_bool_dtype(series):
+        return 'N'
+    elif pd.api.types.is_numeric_dtype(series):
+        return 'Q'
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        return 'T'
+    elif isinstance(series.dtype, pd.CategoricalDtype):
+        return 'O'
+    return 'N'
+
+
 def despine(chart):
     """Despine altair chart.
     """
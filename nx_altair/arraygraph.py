@@ -0,0 +1,380 @@
+import weakref
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+
+def _records(df):
+    """Rows of ``df`` as attribute dicts, one (empty) dict per row even
+    when it has no columns.
+    """
+    if len(df.columns):
+        return df.to_dict('records')
+    return [{} for _ in range(len(df))]
+
+
+class ArrayGraph(object):
+    """A read-only graph held as integer edge arrays.
+
+    Nodes are the entries of ``node_index`` and edges the pairs
+    ``(source[i], target[i])`` of positions into it, so tables are built
+    from an ArrayGraph by array indexing alone. It offers the parts of the
+    networkx graph API that the rest of the package reads (``nodes``,
+    ``edges``, ``number_of_nodes``, ...); those that return Python objects
+    per edge are only meant for small graphs. Parallel edges are kept as
+    separate edges.
+
+    Build one with ``as_graph``.
+
+    Parameters
+    ----------
+    node_index : pandas.Index
+       Node ids.
+
+    source, target : integer arrays
+       Positions of the end points of every edge in ``node_index``.
+
+    edge_data : pandas.DataFrame, optional
+       Edge attributes, one row per edge (default=None, no attributes).
+
+    node_data : pandas.DataFrame, optional
+       Node attributes, one row per node in the order of ``node_index``
+       (default=None, no attributes).
+
+    directed : bool, optional (default=False)
+       Whether edges run from source to target.
+    """
+    def __init__(self, node_index, source, target, edge_data=None,
+                 node_data=None, directed=False):
+        self.node_index = node_index
+        self.source = np.asarray(source, dtype=np.intp)
+        self.target = np.asarray(target, dtype=np.intp)
+        if edge_data is None:
+            edge_data = pd.DataFrame(index=pd.RangeIndex(len(self.source)))
+        if node_data is None:
+            node_data = pd.DataFrame(index=pd.RangeIndex(len(node_index)))
+        self.edge_data = edge_data.reset_index(drop=True)
+        self.node_data = node_data.reset_index(drop=True)
+        self.directed = directed
+
+    def __len__(self):
+        return len(self.node_index)
+
+    def __iter__(self):
+        return iter(self.node_index)
+
+    def __contains__(self, n):
+        return n in self.node_index
+
+    def is_directed(self):
+        return self.directed
+
+    def is_multigraph(self):
+        return False
+
+    def number_of_nodes(self):
+        return len(self.node_index)
+
+    def number_of_edges(self):
+        return len(self.source)
+
+    def nodes(self, data=False):
+        """List of node ids, or of (node, attributes) pairs with data=True."""
+        nodes = list(self.node_index)
+        if not data:
+            return nodes
+        records = _records(self.node_data)
+        return list(zip(nodes, records))
+
+    def edges(self, data=False, default=None):
+        """List of (u, v) edges, or of (u, v, d) edges with data.
+
+        As in networkx, ``data=True`` gives attribute dicts and a string
+        gives the value of that attribute, or ``default`` when it is not
+        an edge attribute.
+        """
+        u = self.node_index[self.source]
+        v = self.node_index[self.target]
+        if data is False:
+            return list(zip(u, v))
+
+        elif data is True:
+            records = _records(self.edge_data)
+            return list(zip(u, v, records))
+
+        elif data in self.edge_data.columns:
+            return list(zip(u, v, self.edge_data[data]))
+
+        return list(zip(u, v, [default] * len(u)))
+
+    def node_codes(self, nodelist=None):
+        """Positions of the nodes in ``nodelist`` (default=None, all)."""
+        if nodelist is None:
+            return np.arange(len(self.node_index))
+
+        codes = self.node_index.get_indexer(
+            pd.Index(list(nodelist), tupleize_cols=False))
+        if (codes < 0).any():
+            raise KeyError("nodelist holds nodes that are not in the graph.")
+        return codes
+
+    def edge_codes(self, edgelist=None):
+        """Positions of the edges in ``edgelist`` (default=None, all).
+
+        As for networkx graphs, edges that are not in the graph are skipped,
+        duplicates are dropped and every parallel edge of a pair is kept.
+        """
+        if edgelist is None:
+            return np.arange(len(self.source))
+
+        edgelist = list(edgelist)
+        ends = pd.Index(
+            [e[0] for e in edgelist] + [e[1] for e in edgelist],
+            tupleize_cols=False)
+        codes = self.node_index.get_indexer(ends)
+        u, v = codes[:len(edgelist)], codes[len(edgelist):]
+        s, t = self.source, self.target
+        if not self.directed:
+            u, v = np.minimum(u, v), np.maximum(u, v)
+            s, t = np.minimum(s, t), np.maximum(s, t)
+
+        wanted = pd.DataFrame({'s': u, 't': v}).drop_duplicates()
+        wanted['order'] = np.arange(len(wanted))
+        edges = pd.DataFrame({'s': s, 't': t, 'edge': np.arange(len(s))})
+        matched = wanted.merge(edges, on=['s', 't']).sort_values(['order', 'edge'])
+        return matched['edge'].to_numpy()
+
+    def to_networkx(self):
+        """Copy of the graph as a networkx Graph or DiGraph."""
+        H = nx.DiGraph() if self.directed else nx.Graph()
+        H.add_nodes_from(self.nodes(data=True))
+        H.add_edges_from(self.edges(data=True))
+        return H
+
+
+def _codes(values, nodes):
+    """Positions of ``values`` in ``nodes``, or factorized codes and node
+    ids in order of first appearance when ``nodes`` is None.
+    """
+    if nodes is None:
+        codes, uniques = pd.factorize(values)
+        return codes, pd.Index(uniques, tupleize_cols=False)
+
+    node_index = pd.Index(nodes, tupleize_cols=False)
+    codes = node_index.get_indexer(values)
+    if (codes < 0).any():
+        raise KeyError("Edges refer to nodes that are not in nodes.")
+    return codes, node_index
+
+
+def as_graph(data, nodes=None, source='source', target='target',
+             directed=None, weight='weight', node_data=None):
+    """Wrap an edge list or adjacency matrix as a graph to draw.
+
+    networkx graphs and ArrayGraphs are returned unchanged.
+
+    Parameters
+    ----------
+    data : graph, DataFrame, array or sparse matrix
+       A pandas edge list with ``source`` and ``target`` columns, whose
+       other columns become edge attributes; an (E, 2) array of end
+       points; or a square SciPy sparse matrix (anything with ``tocoo``),
+       whose values become the ``weight`` attribute.
+
+    nodes : sequence, optional
+       Node ids. For edge lists, the end points are looked up in it and
+       nodes without edges are kept; for matrices these are the ids of the
+       rows (default=None, the ids found in the edge list in order of
+       first appearance, or the row numbers of the matrix).
+
+    source, target : string, optional (default='source', 'target')
+       End point columns of a DataFrame edge list.
+
+    directed : bool, optional
+       Whether edges are directed (default=None: False for edge lists;
+       for matrices, False when the matrix is symmetric, in which case
+       only its upper triangle is read).
+
+    weight : string, optional (default='weight')
+       Attribute name for the values of a matrix.
+
+    node_data : pandas.DataFrame, optional
+       Node attributes indexed by node id. Its index gives the nodes when
+       ``nodes`` is None.
+
+    Returns
+    -------
+    G : networkx graph or ArrayGraph
+    """
+    if isinstance(data, (nx.Graph, ArrayGraph)):
+        return data
+
+    if nodes is None and node_data is not None:
+        nodes = node_data.index
+
+    if isinstance(data, pd.DataFrame):
+        ends = pd.concat([data[source], data[target]], ignore_index=True)
+        codes, node_index = _codes(ends.to_numpy(), nodes)
+        src, dst = codes[:len(data)], codes[len(data):]
+        edge_data = data.drop(columns=[source, target])
+        directed = bool(directed)
+
+    elif hasattr(data, 'tocoo'):
+        A = data.tocoo()
+        if A.shape[0] != A.shape[1]:
+            raise Exception("Adjacency matrices must be square.")
+
+        if directed is None:
+            directed = (abs(A - A.T) > 0).nnz > 0
+        src, dst, values = A.row, A.col, A.data
+        if not directed:
+            upper = src <= dst
+            src, dst, values = src[upper], dst[upper], values[upper]
+
+        node_index = pd.RangeIndex(A.shape[0]) if nodes is None else \
+            pd.Index(nodes, tupleize_cols=False)
+        if len(node_index) != A.shape[0]:
+            raise Exception("nodes must have one id per row of the matrix.")
+        edge_data = pd.DataFrame({weight: values})
+
+    elif isinstance(data, np.ndarray) and data.ndim == 2 and data.shape[1] == 2:
+        codes, node_index = _codes(data.reshape(-1), nodes)
+        src, dst = codes[0::2], codes[1::2]
+        edge_data = None
+        directed = bool(directed)
+
+    else:
+        raise Exception(
+            "G must be a graph, an edge list DataFrame, an (E, 2) array "
+            "or a sparse matrix.")
+
+    if node_data is not None:
+        node_data = node_data.reindex(node_index)
+    return ArrayGraph(node_index, src, dst, edge_data=edge_data,
+                      node_data=node_data, directed=directed)
+
+
+class Positions(Mapping):
+    """Node positions as an (N, 2) array, with the node id of every row.
+
+    A read-only mapping from node to position, so it stands in for a
+    dictionary of positions anywhere; tables gather their coordinates
+    from it with one indexing operation instead of a lookup per node.
+
+    Build one with ``as_positions``.
+
+    Parameters
+    ----------
+    xy : array
+       (N, 2) positions.
+
+    node_index : sequence
+       Node id of every row of ``xy``.
+    """
+    def __init__(self, xy, node_index):
+        self.xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        if not isinstance(node_index, pd.Index):
+            node_index = pd.Index(list(node_index), tupleize_cols=False)
+        if len(node_index) != len(self.xy):
+            raise Exception("pos needs one node id per row of positions.")
+        self.node_index = node_index
+        self._aligned = None
+
+    def __getitem__(self, n):
+        return self.xy[self.node_index.get_loc(n)]
+
+    def __iter__(self):
+        return iter(self.node_index)
+
+    def __len__(self):
+        return len(self.xy)
+
+    def __contains__(self, n):
+        return n in self.node_index
+
+    def take(self, nodes):
+        """Positions of ``nodes`` as an (N, 2) array."""
+        rows = self.node_index.get_indexer(
+            pd.Index(list(nodes), tupleize_cols=False))
+        if (rows < 0).any():
+            raise KeyError("pos has no position for some nodes.")
+        return self.xy[rows]
+
+    def aligned(self, G):
+        """Positions of every node of G in the order of G.
+
+        ArrayGraphs can't change, so the result for the last one is kept
+        and the layers of one chart share a single gather. networkx graphs
+        may be changed in place and are looked up again on every call.
+        """
+        if isinstance(G, ArrayGraph):
+            if self._aligned is None or self._aligned[0]() is not G:
+                self._aligned = (weakref.ref(G), self._gather(G.node_index))
+            return self._aligned[1]
+
+        return self._gather(pd.Index(list(G.nodes()), tupleize_cols=False))
+
+    def _gather(self, nodes):
+        if self.node_index.equals(nodes):
+            return self.xy
+        return self.take(nodes)
+
+
+def as_positions(pos, G=None):
+    """Node positions in array form.
+
+    Parameters
+    ----------
+    pos : dictionary, DataFrame, array or tuple
+       A dictionary of positions keyed by node; a DataFrame with x and y
+       columns indexed by node; an ``(xy, nodes)`` tuple of an (N, 2)
+       array and the node id of each row; or an (N, 2) array whose rows
+       follow the order of the nodes of G.
+
+    G : graph, optional
+       The graph, needed when ``pos`` is a bare array.
+
+    Returns
+    -------
+    pos : Positions
+       None when ``pos`` is None.
+    """
+    if pos is None or isinstance(pos, Positions):
+        return pos
+
+    elif isinstance(pos, pd.DataFrame):
+        return Positions(pos[['x', 'y']].to_numpy(dtype=float), pos.index)
+
+    elif isinstance(pos, tuple):
+        xy, nodes = pos
+        return Positions(xy, nodes)
+
+    elif isinstance(pos, np.ndarray):
+        if G is None:
+            raise Exception("An array of positions needs its graph or node ids.")
+        nodes = G.node_index if isinstance(G, ArrayGraph) else list(G.nodes())
+        return Positions(pos, nodes)
+
+    nodes = list(pos)
+    xy = np.array([pos[n] for n in nodes], dtype=float).reshape(len(nodes), 2)
+    return Positions(xy, nodes)
+
+
+def node_positions(G, pos, nodes=None):
+    """Positions of ``nodes`` (default=None, every node of G in order) as
+    an (N, 2) float array.
+
+    ``pos`` takes any form accepted by ``as_positions``. Dictionaries are
+    read node by node; every other form is gathered with one indexing
+    operation.
+    """
+    if isinstance(pos, dict):
+        nodes = list(G.nodes() if nodes is None else nodes)
+        return np.array([pos[n] for n in nodes], dtype=float).reshape(len(nodes), 2)
+
+    pos = as_positions(pos, G)
+    if nodes is None:
+        return pos.aligned(G)
+    return pos.take(nodes)
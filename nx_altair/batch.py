@@ -0,0 +1,160 @@
+import os
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from .draw_altair import draw_networkx
+
+
+# Chart outputs: (method of the chart, file extension)
+OUTPUTS = {
+    'dict': ('to_dict', None),
+    'json': ('to_json', 'json'),
+    'html': ('to_html', 'html'),
+}
+
+
+class BatchResult(object):
+    """Outcome of drawing one item of a ``draw_many`` batch.
+
+    Attributes
+    ----------
+    index : int
+       Position of the item in the batch.
+
+    value : dict, string or None
+       The chart dict, JSON or HTML, or the path of the file it was written
+       to; None when the item failed.
+
+    error : string or None
+       Traceback of the failure, if any.
+
+    seconds : float
+       Time spent drawing and serializing the item.
+    """
+    def __init__(self, index, value=None, error=None, seconds=0.0):
+        self.index = index
+        self.value = value
+        self.error = error
+        self.seconds = seconds
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        state = 'ok' if self.ok else 'failed'
+        return '<BatchResult {} {} in {:.3f}s>'.format(self.index, state, self.seconds)
+
+
+def _draw_one(index, item, output, directory):
+    """Draw and serialize one item; runs in a worker."""
+    start = time.perf_counter()
+    try:
+        G, pos = item[0], item[1]
+        options = item[2] if len(item) > 2 and item[2] is not None else {}
+        chart = draw_networkx(G, pos, **options)
+
+        method, extension = OUTPUTS[output]
+        value = getattr(chart, method)()
+        if directory is not None:
+            path = os.path.join(
+                directory, 'chart-{:06d}.{}'.format(index, extension))
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(value)
+            value = path
+        return BatchResult(index, value, seconds=time.perf_counter() - start)
+
+    except Exception:
+        return BatchResult(index, error=traceback.format_exc(),
+                           seconds=time.perf_counter() - start)
+
+
+def draw_many(items, output='dict', directory=None, executor='process',
+              max_workers=None, max_in_flight=None):
+    """Draw many graphs with ``draw_networkx`` on a pool of workers.
+
+    Items are submitted as earlier ones finish, so at most
+    ``max_in_flight`` of them are held in memory at once, and results are
+    yielded in the order of ``items``. A failing item is reported in its
+    result and does not stop the batch.
+
+    Parameters
+    ----------
+    items : iterable
+       ``(G, pos)`` or ``(G, pos, options)`` tuples, where options is a
+       dict of keyword arguments for ``draw_networkx``.
+
+    output : 'dict', 'json' or 'html', optional (default='dict')
+       What to make of every chart.
+
+    directory : string, optional
+       Write each chart to ``chart-<index>.json`` or ``.html`` in this
+       directory and yield the file paths instead (default=None). Needs
+       output='json' or 'html'.
+
+    executor : 'process', 'thread' or Executor, optional (default='process')
+       Run items in a process pool, a thread pool or on a given
+       ``concurrent.futures.Executor``. Process pools need picklable
+       graphs and options.
+
+    max_workers : int, optional (default=None)
+       Size of the pool created for 'process' or 'thread'.
+
+    max_in_flight : int, optional (default=None)
+       Most items submitted and not yet yielded. Defaults to twice the
+       number of workers.
+
+    Yields
+    ------
+    result : BatchResult
+       One per item, in order.
+    """
+    if output not in OUTPUTS:
+        raise Exception("output must be one of {}.".format(
+            ", ".join(sorted(OUTPUTS))))
+
+    if directory is not None:
+        if OUTPUTS[output][1] is None:
+            raise Exception("directory needs output='json' or 'html'.")
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    if isinstance(executor, Executor):
+        pool, owned = executor, False
+    elif executor == 'process':
+        pool, owned = ProcessPoolExecutor(max_workers=max_workers), True
+    elif executor == 'thread':
+        pool, owned = ThreadPoolExecutor(max_workers=max_workers), True
+    else:
+        raise Exception("executor must be 'process', 'thread' or an Executor.")
+
+    if max_in_flight is None:
+        max_in_flight = 2 * (max_workers or os.cpu_count() or 1)
+
+    pending = deque()
+    try:
+        for index, item in enumerate(items):
+            if len(pending) >= max_in_flight:
+                yield _result(*pending.popleft())
+            future = pool.submit(_draw_one, index, item, output, directory)
+            pending.append((index, future))
+
+        while pending:
+            yield _result(*pending.popleft())
+    finally:
+        for _, future in pending:
+            future.cancel()
+        if owned:
+            pool.shutdown(wait=True)
+
+
+def _result(index, future):
+    """Result of a submitted item, including failures to run it at all,
+    such as items that can't be pickled.
+    """
+    try:
+        return future.result()
+    except Exception:
+        return BatchResult(index, error=traceback.format_exc())
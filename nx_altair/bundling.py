@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+from .core import _interleave
+from .arraygraph import ArrayGraph, node_positions
+
+
+def community_labels(G, communities=None, weight='weight', seed=None):
+    """Community of every node of G as a dict of integer labels.
+
+    Parameters
+    ----------
+    G : graph
+       A networkx graph
+
+    communities : dict or list of sets, optional
+       Node to label mapping, or a partition of the nodes as returned by
+       ``networkx.community`` (default=None, detected with Louvain, or
+       label propagation on networkx versions without it).
+
+    weight : string, optional (default='weight')
+       Edge attribute used as weight by community detection.
+
+    seed : int, optional (default=None)
+       Seed for community detection.
+    """
+    if communities is None:
+        if isinstance(G, ArrayGraph):
+            G = G.to_networkx()
+        louvain = getattr(nx.community, 'louvain_communities', None)
+        if louvain is not None:
+            communities = louvain(G, weight=weight, seed=seed)
+        else:
+            communities = nx.community.label_propagation_communities(
+                G.to_undirected(as_view=True))
+
+    if isinstance(communities, dict):
+        codes, _ = pd.factorize(pd.Series(communities))
+        return dict(zip(communities, codes))
+
+    return {n: i for i, members in enumerate(communities) for n in members}
+
+
+def bundle_edges(df_segments, pos, labels, max_points=None, G=None):
+    """Bundle the edges between communities into shared, weighted marks.
+
+    Every edge between two communities is routed from its source to the
+    centroid of the source's community, along a trunk to the centroid of
+    the target's community and on to its target. Edges sharing a piece of
+    that route are merged into one mark whose 'weight' counts them, so
+    there is one trunk per pair of linked communities and one spoke per
+    node with edges leaving its community. Edges within a community stay
+    straight.
+
+    When the marks need more than ``max_points`` points (two per mark),
+    the result is coarsened step by step: edges within communities are
+    routed through the centroid too, then spokes are dropped and only
+    trunks are kept, and last only the heaviest trunks.
+
+    Parameters
+    ----------
+    df_segments : pandas.DataFrame
+       Edge table with one row per edge, see ``core.to_pandas_edge_segments``.
+
+    pos : dictionary
+       A dictionary with nodes as keys and positions as values.
+
+    labels : dict
+       Integer community label of every node, see ``community_labels``.
+
+    max_points : int, optional (default=None)
+       Upper bound on the number of points in the result.
+
+    G : graph, optional
+       The graph drawn, needed when ``pos`` is an array (default=None).
+
+    Returns
+    -------
+    df : pandas.DataFrame
+       Two rows per mark with columns edge (mark id), kind ('edge',
+       'spoke' or 'trunk'), weight, x and y.
+    """
+    nodes = list(labels)
+    label = np.array([labels[n] for n in nodes], dtype=np.int64)
+    xy = node_positions(G, pos, nodes)
+
+    # ---------- Community centroids ------------
+    size = np.bincount(label, minlength=label.max() + 1 if len(label) else 0)
+    centroid = np.column_stack([
+        np.bincount(label, weights=xy[:, 0], minlength=len(size)),
+        np.bincount(label, weights=xy[:, 1], minlength=len(size)),
+    ]) / np.maximum(size, 1)[:, None]
+
+    index = pd.Index(nodes, tupleize_cols=False)
+    source = index.get_indexer(np.asarray(df_segments['source'], dtype=object))
+    target = index.get_indexer(np.asarray(df_segments['target'], dtype=object))
+    if ((source < 0) | (target < 0)).any():
+        raise Exception("labels must give a community for every end point of the edges.")
+    cs, ct = label[source], label[target]
+    intra = cs == ct
+
+    # ---------- Trunks: one per pair of linked communities ------------
+    pair = pd.DataFrame({
+        'a': np.minimum(cs, ct)[~intra],
+        'b': np.maximum(cs, ct)[~intra],
+    })
+    trunks = pair.groupby(['a', 'b'], sort=False).size()
+    trunk_a = trunks.index.get_level_values('a').to_numpy()
+    trunk_b = trunks.index.get_level_values('b').to_numpy()
+
+    def spokes(include_intra):
+        mask = np.ones(len(cs), dtype=bool) if include_intra else ~intra
+        ends = pd.Series(np.concatenate([source[mask], target[mask]]))
+        return ends.value_counts(sort=False)
+
+    # ---------- Pick the finest level within the budget ------------
+    spoke = spokes(False)
+    n_marks = len(trunks) + len(spoke) + int(intra.sum())
+    keep_intra = True
+    if max_points is not None and 2 * n_marks > max_points:
+        keep_intra = False
+        spoke = spokes(True)
+        n_marks = len(trunks) + len(spoke)
+    if max_points is not None and 2 * n_marks > max_points:
+        spoke = spoke.iloc[:0]
+        order = np.argsort(-trunks.to_numpy(), kind='stable')
+        order = order[:max(0, max_points // 2)]
+        trunks = trunks.iloc[order]
+        trunk_a, trunk_b = trunk_a[order], trunk_b[order]
+
+    # ---------- Assemble marks ------------
+    first, second, kind, weight = [], [], [], []
+
+    if keep_intra:
+        edge = np.flatnonzero(intra)
+        first.append(xy[source[edge]])
+        second.append(xy[target[edge]])
+        kind.append(np.repeat('edge', len(edge)))
+        weight.append(np.ones(len(edge), dtype=np.int64))
+
+    spoke_nodes = spoke.index.to_numpy(dtype=np.int64)
+    first.append(xy[spoke_nodes])
+    second.append(centroid[label[spoke_nodes]])
+    kind.append(np.repeat('spoke', len(spoke)))
+    weight.append(spoke.to_numpy(dtype=np.int64))
+
+    first.append(centroid[trunk_a])
+    second.append(centroid[trunk_b])
+    kind.append(np.repeat('trunk', len(trunks)))
+    weight.append(trunks.to_numpy(dtype=np.int64))
+
+    first = np.concatenate(first).reshape(-1, 2)
+    second = np.concatenate(second).reshape(-1, 2)
+    points = _interleave(first, second)
+    return pd.DataFrame({
+        'edge': np.repeat(np.arange(len(first)), 2),
+        'kind': np.repeat(np.concatenate(kind), 2),
+        'weight': np.repeat(np.concatenate(weight), 2),
+        'x': points[:, 0],
+        'y': points[:, 1],
+    })
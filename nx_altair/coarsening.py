@@ -0,0 +1,291 @@
+import numpy as np
+import networkx as nx
+
+from .core import _edge_index
+from .arraygraph import as_graph, node_positions
+from .bundling import community_labels
+from .draw_altair import draw_networkx
+
+
+def _contract(labels, src, dst, w, directed=False):
+    """Merge edges whose end points share labels, summing their weights.
+
+    Edges inside a label are dropped. Returns the end points, total weight
+    and number of merged edges of every remaining label pair.
+    """
+    a, b = labels[src], labels[dst]
+    keep = a != b
+    a, b, w = a[keep], b[keep], w[keep]
+    if not directed:
+        a, b = np.minimum(a, b), np.maximum(a, b)
+
+    k = int(labels.max()) + 1 if len(labels) else 0
+    pairs, inverse = np.unique(a * k + b, return_inverse=True)
+    total = np.bincount(inverse, weights=w, minlength=len(pairs))
+    count = np.bincount(inverse, minlength=len(pairs))
+    return pairs // max(k, 1), pairs % max(k, 1), total, count
+
+
+def _heavy_edge_matching(n, a, b, w, size, rng, rounds=8):
+    """Pair up nodes along heavy edges, as integer labels of the groups.
+
+    Every free node points at its free neighbour with the largest weight
+    per member pair, ``w / (size[a] * size[b])``, so super-nodes stay
+    balanced; nodes pointing at each other are matched. Nodes left over,
+    such as the leaves of a star, then join the pair of their heaviest
+    neighbour. Edges are sorted once, so each round is a linear scan.
+    """
+    node = np.arange(n)
+    mate = node.copy()
+    a, b = np.concatenate([a, b]), np.concatenate([b, a])
+    score = np.concatenate([w, w]) / (size[a] * size[b])
+
+    # Incidences by node, heaviest first, ties broken at random.
+    order = np.lexsort((rng.random(len(a)), -score, a))
+    a, b = a[order], b[order]
+
+    def heaviest(a, b):
+        first = np.diff(a, prepend=-1) != 0
+        best = node.copy()
+        best[a[first]] = b[first]
+        return best
+
+    for _ in range(rounds):
+        free = (mate[a] == a) & (mate[b] == b)
+        if not free.any():
+            break
+
+        best = heaviest(a[free], b[free])
+        mutual = (best[best] == node) & (best != node)
+        if not mutual.any():
+            break
+        mate[mutual] = best[mutual]
+
+    label = np.minimum(node, mate)
+    matched = mate != node
+    best = heaviest(a, b)
+    join = ~matched & matched[best]
+    label[join] = label[best[join]]
+    return np.unique(label, return_inverse=True)[1]
+
+
+def coarsen(G, pos=None, method='matching', communities=None, max_nodes=100,
+            levels=None, min_reduction=0.05, weight='weight', seed=None):
+    """Collapse the nodes of G into super-nodes for an overview chart.
+
+    With method='matching', nodes are contracted in levels by heavy edge
+    matching, each level roughly halving the number of nodes, until at most
+    ``max_nodes`` are left, ``levels`` levels are built, or a level removes
+    fewer than ``min_reduction`` of the nodes. Every level costs a sort of
+    the edges of the previous one and levels shrink geometrically, so the
+    whole run is near-linear on sparse graphs. With method='community',
+    every community is one super-node, see ``bundling.community_labels``.
+
+    Parameters
+    ----------
+    G : graph
+       A networkx graph
+
+    pos : dictionary, optional
+       A dictionary with nodes as keys and positions as values. Super-nodes
+       are placed at the centroid of their members (default=None).
+
+    method : 'matching' or 'community', optional (default='matching')
+       How nodes are grouped.
+
+    communities : dict or list of sets, optional
+       Communities for method='community' (default=None, detected from G).
+
+    max_nodes : int, optional (default=100)
+       Stop matching once this many super-nodes are left.
+
+    levels : int, optional (default=None)
+       Maximum number of matching levels.
+
+    min_reduction : float, optional (default=0.05)
+       Stop matching when a level removes fewer than this share of nodes.
+
+    weight : string, optional (default='weight')
+       Edge attribute to aggregate; missing weights count as 1.
+
+    seed : int, optional (default=None)
+       Seed for tie-breaking and community detection.
+
+    Returns
+    -------
+    coarsening : Coarsening
+       The coarse graph with the mapping back to G.
+    """
+    G = as_graph(G)
+    nodes = list(G.nodes())
+    src, dst, w = _edge_index(G, nodes, weight=weight)
+    hierarchy = [np.arange(len(nodes))]
+
+    if method == 'community':
+        labels = community_labels(G, communities, weight=weight, seed=seed)
+        codes = np.array([labels[n] for n in nodes], dtype=np.int64)
+        hierarchy.append(np.unique(codes, return_inverse=True)[1])
+
+    elif method == 'matching':
+        rng = np.random.default_rng(seed)
+        current = hierarchy[0]
+        n = len(nodes)
+        a, b, lw = src, dst, w
+        size = np.ones(n)
+        while n > max_nodes and (levels is None or len(hierarchy) <= levels):
+            step = _heavy_edge_matching(n, a, b, lw, size, rng)
+            k = int(step.max()) + 1 if n else 0
+            if n - k < max(1, min_reduction * n):
+                break
+
+            a, b, lw, _ = _contract(step, a, b, lw)
+            size = np.bincount(step, weights=size, minlength=k)
+            current = step[current]
+            hierarchy.append(current)
+            n = k
+
+    else:
+        raise Exception("method must be 'matching' or 'community'.")
+
+    level = len(hierarchy) - 1
+    group = hierarchy[-1]
+    group_level = np.full(int(group.max()) + 1 if len(group) else 0, level)
+    return Coarsening(G, pos, nodes, src, dst, w, hierarchy, group,
+                      group_level, weight=weight)
+
+
+class Coarsening(object):
+    """Super-nodes of a graph, with the mapping to expand them again.
+
+    ``graph`` holds one node per super-node, with the number of original
+    nodes it stands for as 'size' and its level in the hierarchy as
+    'level' (0 for original nodes). Its edges hold the summed ``weight``
+    and the number of merged edges as 'count'. A super-node is named after
+    its member with the most edges, so ids never clash with nodes of G
+    brought back by ``expand``.
+
+    Build it with ``coarsen``.
+    """
+    def __init__(self, G, pos, nodes, src, dst, w, hierarchy, group,
+                 group_level, weight='weight'):
+        self.G = G
+        self.weight = weight
+        self._pos = pos
+        self._nodes = nodes
+        self._src = src
+        self._dst = dst
+        self._w = w
+        self._hierarchy = hierarchy
+        self._group = group
+        self._group_level = group_level
+        self._graph = None
+        self._super_pos = None
+        self._names = None
+
+    @property
+    def names(self):
+        """Super-node id of every group, in group order."""
+        if self._names is None:
+            group = self._group
+            degree = np.bincount(
+                np.concatenate([self._src, self._dst]),
+                minlength=len(group))
+            order = np.lexsort((-degree, group))
+            first = np.diff(group[order], prepend=-1) != 0
+            self._names = [self._nodes[i] for i in order[first]]
+        return self._names
+
+    @property
+    def graph(self):
+        """The coarse networkx graph."""
+        if self._graph is None:
+            names = self.names
+            size = np.bincount(self._group, minlength=len(names))
+            a, b, total, count = _contract(
+                self._group, self._src, self._dst, self._w,
+                directed=self.G.is_directed())
+
+            H = nx.DiGraph() if self.G.is_directed() else nx.Graph()
+            H.add_nodes_from(
+                (name, {'size': int(s), 'level': int(l)})
+                for name, s, l in zip(names, size, self._group_level))
+            H.add_edges_from(
+                (names[i], names[j], {self.weight: float(t), 'count': int(c)})
+                for i, j, t, c in zip(a, b, total, count))
+            self._graph = H
+        return self._graph
+
+    @property
+    def pos(self):
+        """Centroid of the members of every super-node, or None when the
+        coarsening was built without positions.
+        """
+        if self._pos is None:
+            return None
+
+        if self._super_pos is None:
+            xy = node_positions(self.G, self._pos, self._nodes)
+            size = np.bincount(self._group, minlength=len(self.names))
+            centroid = np.column_stack([
+                np.bincount(self._group, weights=xy[:, 0], minlength=len(size)),
+                np.bincount(self._group, weights=xy[:, 1], minlength=len(size)),
+            ]) / np.maximum(size, 1)[:, None]
+            self._super_pos = dict(zip(self.names, centroid))
+        return self._super_pos
+
+    @property
+    def labels(self):
+        """Super-node of every node of G."""
+        names = self.names
+        return {n: names[g] for n, g in zip(self._nodes, self._group)}
+
+    @property
+    def members(self):
+        """Nodes of G in every super-node."""
+        members = {name: [] for name in self.names}
+        for n, g in zip(self._nodes, self._group):
+            members[self.names[g]].append(n)
+        return members
+
+    def expand(self, node):
+        """Drill down into one super-node.
+
+        Returns a new ``Coarsening`` where ``node`` is replaced by the
+        super-nodes it was built from one level down, or by its members
+        in G when it was built from them directly.
+        """
+        names = self.names
+        try:
+            g = names.index(node)
+        except ValueError:
+            raise Exception("{!r} is not a super-node.".format(node))
+
+        level = self._group_level[g]
+        if level == 0:
+            return self
+
+        inside = self._group == g
+        children = np.unique(
+            self._hierarchy[level - 1][inside], return_inverse=True)[1]
+
+        # Children take new ids after the existing groups, then ids are
+        # made contiguous again.
+        group = self._group.copy()
+        group[inside] = len(names) + children
+        group_level = np.concatenate([
+            self._group_level,
+            np.full(int(children.max()) + 1, level - 1)
+        ])
+        used, group = np.unique(group, return_inverse=True)
+        return Coarsening(
+            self.G, self._pos, self._nodes, self._src, self._dst, self._w,
+            self._hierarchy, group, group_level[used], weight=self.weight)
+
+    def draw(self, **kwargs):
+        """Draw the coarse graph with ``draw_networkx``, sizing super-nodes
+        by their number of members and edges by their weight.
+        """
+        kwargs.setdefault('node_size', 'size')
+        if self.graph.number_of_edges():
+            kwargs.setdefault('width', self.weight)
+        return draw_networkx(self.graph, self.pos, **kwargs)
@@ -1,127 +1,999 @@
+import itertools
+
+import numpy as np
 import pandas as pd
 import networkx as nx
 import altair as alt
 from ._utils import despine
+from .spatial import clip_segments
+from .arraygraph import ArrayGraph, _records, as_graph, as_positions, node_positions
+
+def _attribute_columns(data, size, attributes=None):
+    """Gather a sequence of attribute dictionaries into one list per key.
+
+    Every list has length ``size``; entries missing from a dictionary are
+    left as NaN so that pandas can infer a proper dtype for each column.
+    When ``attributes`` is given only those keys are gathered, and keys
+    that no dictionary holds get no column.
+    """
+    columns = {}
+    if attributes is None:
+        for i, attrs in enumerate(data):
+            for key, value in attrs.items():
+                column = columns.get(key)
+                if column is None:
+                    column = columns[key] = [np.nan] * size
+                column[i] = value
+    else:
+        attributes = list(attributes)
+        for i, attrs in enumerate(data):
+            for key in attributes:
+                if key in attrs:
+                    column = columns.get(key)
+                    if column is None:
+                        column = columns[key] = [np.nan] * size
+                    column[i] = attrs[key]
+    return columns
+
+
+def compact_frame(df):
+    """Return a copy of a node or edge DataFrame with compact dtypes.
+
+    The tuple-valued pair column is dropped (the integer edge column already
+    identifies each edge), source/target ids become categoricals, positions
+    become float32 (the one lossy step) and other numeric columns are
+    downcast only where every value is kept exactly. This lowers memory
+    use; it does not shrink inline chart JSON.
+    """
+    columns = {}
+    for name, column in df.items():
+        if name == 'pair':
+            continue
+        elif name in ('x', 'y', 'x2', 'y2'):
+            column = column.astype(np.float32)
+        elif name in ('source', 'target'):
+            column = column.astype('category')
+        elif pd.api.types.is_bool_dtype(column):
+            pass
+        elif pd.api.types.is_integer_dtype(column):
+            column = pd.to_numeric(column, downcast='integer')
+        elif pd.api.types.is_float_dtype(column):
+            down = pd.to_numeric(column, downcast='float')
+            # Keep float64 unless every value survives the round trip.
+            if down.astype(column.dtype).equals(column):
+                column = down
+        columns[name] = column
+    return pd.DataFrame(columns, index=df.index)
+
+
+def _select_nodes(G, nodelist=None):
+    """Yield ``(node, data)`` for the nodes of G, or only for those in
+    nodelist when it is given.
+    """
+    if isinstance(G, ArrayGraph):
+        codes = G.node_codes(nodelist)
+        records = _records(G.node_data.iloc[codes])
+        for n, attrs in zip(G.node_index[codes], records):
+            yield n, attrs
+        return
+
+    if nodelist is None:
+        for item in G.nodes(data=True):
+            yield item
+    else:
+        for n in nodelist:
+            yield n, G.nodes[n]
 
-def to_pandas_nodes(G, pos):
+
+def _select_edges(G, edgelist=None):
+    """Yield ``(u, v, data)`` for the edges of G, or only for those in
+    edgelist when it is given.
+
+    Requested edges are looked up by key in G's adjacency, so the cost
+    scales with the length of edgelist rather than with the size of G.
+    Edges that are not in G are skipped and duplicates are dropped.
+    """
+    if isinstance(G, ArrayGraph):
+        codes = G.edge_codes(edgelist)
+        records = _records(G.edge_data.iloc[codes])
+        for u, v, attrs in zip(G.node_index[G.source[codes]],
+                               G.node_index[G.target[codes]], records):
+            yield u, v, attrs
+        return
+
+    if edgelist is None:
+        for item in G.edges(data=True):
+            yield item
+        return
+
+    directed = G.is_directed()
+    seen = set()
+    for e in edgelist:
+        u, v = e[0], e[1]
+        key = (u, v) if directed else frozenset((u, v))
+        if key in seen or not G.has_edge(u, v):
+            continue
+        seen.add(key)
+
+        if G.is_multigraph():
+            for attrs in G[u][v].values():
+                yield u, v, attrs
+        else:
+            yield u, v, G[u][v]
+
+
+def to_pandas_nodes(G, pos, nodelist=None, compact=False, attributes=None):
     """Convert Graph nodes to pandas DataFrame that's readable to Altair.
+
+    Only nodes in ``nodelist`` are converted when it is given, and only the
+    node attributes in ``attributes``. With ``compact=True`` the frame uses
+    the dtypes of ``compact_frame``.
+
+    G may also be an edge list or matrix, see ``arraygraph.as_graph``.
     """
-    # Get all attributes in nodes
-    attributes = ['x', 'y']
-    for n in G.nodes():
-        attributes += list(G.nodes[n].keys())
-    attributes = list(set(attributes))
+    G = as_graph(G)
+    if isinstance(G, ArrayGraph):
+        # Gather positions and attribute columns by node position.
+        codes = G.node_codes(nodelist)
+        nodes = G.node_index[codes]
+        xy = _positions_at(G, pos, codes)
+        columns = dict(x=xy[:, 0], y=xy[:, 1])
+        columns.update(_array_columns(G.node_data, codes, attributes))
+
+    else:
+        nodes, data = [], []
+        for n, attrs in _select_nodes(G, nodelist):
+            nodes.append(n)
+            data.append(attrs)
 
-    # Build a dataframe for all nodes and their attributes
-    df = pd.DataFrame(
-        index=G.nodes(),
-        columns=attributes
+        # Node positions as an (N, 2) float array.
+        xy = node_positions(G, pos, nodes)
+
+        # Collect every node attribute into its own column in a single pass.
+        columns = dict(x=xy[:, 0], y=xy[:, 1])
+        columns.update(_attribute_columns(data, len(nodes), attributes))
+
+    df = pd.DataFrame(columns, index=nodes)
+    if compact:
+        df = compact_frame(df)
+    return df
+
+
+def _positions_at(G, pos, codes):
+    """Positions of the nodes of an ArrayGraph at positions ``codes``."""
+    if isinstance(pos, dict):
+        return node_positions(G, pos, G.node_index[codes])
+    return as_positions(pos, G).aligned(G)[codes]
+
+
+def _array_columns(data, codes, attributes=None):
+    """Attribute columns of an ArrayGraph table, gathered at ``codes``."""
+    names = data.columns if attributes is None else \
+        [name for name in attributes if name in data.columns]
+    return {name: data[name].to_numpy()[codes] for name in names}
+
+
+def _array_edge_frame(G, codes, attributes=None, pair=True, start=0):
+    """Per-edge DataFrame of the edges of an ArrayGraph at ``codes``,
+    numbered from ``start``.
+    """
+    sources = G.node_index[G.source[codes]]
+    targets = G.node_index[G.target[codes]]
+    size = len(codes)
+    columns = dict(
+        edge=np.arange(start, start + size),
+        source=sources,
+        target=targets,
     )
+    if pair:
+        columns['pair'] = np.fromiter(
+            zip(sources, targets), dtype=object, count=size)
+    columns.update(_array_columns(G.edge_data, codes, attributes))
+    return pd.DataFrame(columns)
 
-    # Add node data to dataframe.
-    for n in G.nodes:
-        data = dict(
-            x=pos[n][0],
-            y=pos[n][1],
-            **G.nodes[n]
-        )
-        df.loc[n] = data
 
+def _record_edge_frame(edges, attributes=None, pair=True, start=0):
+    """Per-edge DataFrame of ``(u, v, data)`` edges, numbered from
+    ``start``.
+    """
+    sources, targets, data = [], [], []
+    for u, v, attrs in edges:
+        sources.append(u)
+        targets.append(v)
+        data.append(attrs)
+    size = len(data)
+
+    columns = dict(
+        edge=np.arange(start, start + size),
+        source=sources,
+        target=targets,
+    )
+    if pair:
+        columns['pair'] = np.fromiter(
+            zip(sources, targets), dtype=object, count=size)
+    columns.update(_attribute_columns(data, size, attributes))
+    return pd.DataFrame(columns)
+
+
+def _edge_table(G, edgelist=None, attributes=None, pair=True):
+    """Collect the edges of G in a single pass.
+
+    Returns a per-edge DataFrame with edge, source, target, pair and edge
+    attribute columns (only those in ``attributes`` when it is given).
+    The tuple-valued pair column is left out when ``pair`` is False.
+    """
+    G = as_graph(G)
+    if isinstance(G, ArrayGraph):
+        return _array_edge_frame(G, G.edge_codes(edgelist), attributes, pair)
+    return _record_edge_frame(_select_edges(G, edgelist), attributes, pair)
+
+
+def _endpoint_positions(G, pos, df, codes=None):
+    """Source and target positions of the rows of an edge DataFrame, as two
+    (E, 2) arrays. ``codes`` are the edge positions in an ArrayGraph.
+    """
+    if codes is not None:
+        return (_positions_at(G, pos, G.source[codes]),
+                _positions_at(G, pos, G.target[codes]))
+
+    # Map node ids to integer indices once and gather their positions.
+    size = len(df)
+    endpoints = np.concatenate([
+        df['source'].to_numpy(dtype=object),
+        df['target'].to_numpy(dtype=object)
+    ])
+    codes, uniques = pd.factorize(endpoints)
+    xy = node_positions(G, pos, uniques)
+    return xy[codes[:size]], xy[codes[size:]]
+
+
+def _edge_arrays(G, pos, edgelist=None, attributes=None, pair=True):
+    """Collect the edges of G as arrays in a single pass.
+
+    Returns a per-edge DataFrame (see ``_edge_table``) and two (E, 2)
+    arrays with the source and target positions.
+    """
+    G = as_graph(G)
+    if isinstance(G, ArrayGraph):
+        codes = G.edge_codes(edgelist)
+        df = _array_edge_frame(G, codes, attributes, pair)
+        return (df,) + _endpoint_positions(G, pos, df, codes)
+
+    df = _record_edge_frame(_select_edges(G, edgelist), attributes, pair)
+    return (df,) + _endpoint_positions(G, pos, df)
+
+
+def _edge_index(G, nodes, weight='weight'):
+    """Edges of G as integer end points into ``nodes`` and float weights.
+
+    Edges without a ``weight`` attribute count as 1.
+    """
+    G = as_graph(G)
+    if isinstance(G, ArrayGraph):
+        codes = pd.Index(list(nodes), tupleize_cols=False).get_indexer(G.node_index)
+        if weight in G.edge_data.columns:
+            w = G.edge_data[weight].fillna(1).to_numpy(dtype=float)
+        else:
+            w = np.ones(len(G.source))
+        return codes[G.source], codes[G.target], w
+
+    index = {n: i for i, n in enumerate(nodes)}
+    size = G.number_of_edges()
+
+    src = np.empty(size, dtype=np.intp)
+    dst = np.empty(size, dtype=np.intp)
+    w = np.empty(size, dtype=float)
+    for i, (u, v, d) in enumerate(G.edges(data=weight, default=1)):
+        src[i] = index[u]
+        dst[i] = index[v]
+        w[i] = d
+    return src, dst, w
+
+
+def _interleave(first, second):
+    """Interleave two (E, 2) position arrays into a (2E, 2) array whose even
+    rows come from ``first`` and odd rows from ``second``.
+    """
+    xy = np.empty((2*len(first), 2), dtype=float)
+    xy[0::2] = first
+    xy[1::2] = second
+    return xy
+
+
+def _position_column(df):
+    """Where position columns go in an edge table: after the ids and pair."""
+    return df.columns.get_loc('pair' if 'pair' in df.columns else 'target') + 1
+
+
+def _interleave_rows(df, first, second):
+    """Repeat every row of ``df`` twice and attach x/y columns that take
+    their values alternately from the (E, 2) arrays ``first`` and ``second``.
+    """
+    xy = _interleave(first, second)
+    df = df.take(np.repeat(np.arange(len(df)), 2)).reset_index(drop=True)
+    at = _position_column(df)
+    df.insert(at, 'x', xy[:, 0])
+    df.insert(at + 1, 'y', xy[:, 1])
+    return df
+
+
+def _segment_rows(df, first, second):
+    """Attach x/y columns from the (E, 2) array ``first`` and x2/y2
+    columns from ``second`` to the rows of ``df``.
+    """
+    at = _position_column(df)
+    df.insert(at, 'x', first[:, 0])
+    df.insert(at + 1, 'y', first[:, 1])
+    df.insert(at + 2, 'x2', second[:, 0])
+    df.insert(at + 3, 'y2', second[:, 1])
     return df
 
 
-def to_pandas_edges(G, pos, **kwargs):
+def to_pandas_edges(G, pos, edgelist=None, compact=False, attributes=None,
+                    **kwargs):
     """Convert Graph edges to pandas DataFrame that's readable to Altair.
+
+    Each edge is written as two rows, one per endpoint. Only edges in
+    ``edgelist`` are converted when it is given, and only the edge
+    attributes in ``attributes``. With ``compact=True`` the frame uses the
+    dtypes of ``compact_frame``.
     """
-    # Get all attributes in nodes
-    attributes = ['source', 'target', 'x', 'y', 'edge', 'pair']
-    for e in G.edges():
-        attributes += list(G.edges[e].keys())
-    attributes = list(set(attributes))
+    df, source_xy, target_xy = _edge_arrays(
+        G, pos, edgelist=edgelist, attributes=attributes, pair=not compact)
+    df = _interleave_rows(df, source_xy, target_xy)
+    if compact:
+        df = compact_frame(df)
+    return df
 
 
-    # Build a dataframe for all edges and their attributes
-    df = pd.DataFrame(
-        index=range(G.size()*2),
-        columns=attributes
-    )
+def to_pandas_edge_segments(G, pos, edgelist=None, compact=False,
+                            attributes=None, **kwargs):
+    """Convert Graph edges to pandas DataFrame with a single row per edge.
 
-    # Add node data to dataframe.
-    for i, e in enumerate(G.edges):
-        idx = i*2
-
-        data1 = dict(
-            edge=i,
-            source=e[0],
-            target=e[1],
-            pair=e,
-            x=pos[e[0]][0],
-            y=pos[e[0]][1],
-            **G.edges[e]
-        )
+    The source position is stored in the x/y columns and the target
+    position in the x2/y2 columns, ready to draw with ``mark_rule``. Only
+    edges in ``edgelist`` are converted when it is given, and only the edge
+    attributes in ``attributes``. With ``compact=True`` the frame uses the
+    dtypes of ``compact_frame``.
+    """
+    df, source_xy, target_xy = _edge_arrays(
+        G, pos, edgelist=edgelist, attributes=attributes, pair=not compact)
+    df = _segment_rows(df, source_xy, target_xy)
+    if compact:
+        df = compact_frame(df)
+    return df
 
-        data2 = dict(
-            edge=i,
-            source=e[0],
-            target=e[1],
-            pair=e,
-            x=pos[e[1]][0],
-            y=pos[e[1]][1],
-            **G.edges[e]
-        )
 
-        df.loc[idx] = data1
-        df.loc[idx+1] = data2
+def to_pandas_edge_ids(G, edgelist=None, compact=False, attributes=None,
+                       **kwargs):
+    """Convert Graph edges to pandas DataFrame without any positions.
 
+    Each edge is a single row of edge id, source and target node ids and
+    edge attributes. Positions are meant to be joined in the browser with
+    a lookup against the node table (see ``GraphFrame.lookup_nodes``),
+    which ``GraphFrame.edge_ids`` keys on integer node codes. Only the
+    edge attributes in ``attributes`` are kept when it is given. With
+    ``compact=True`` the frame uses the dtypes of ``compact_frame``.
+    """
+    df = _edge_table(G, edgelist=edgelist, attributes=attributes, pair=False)
+    if compact:
+        df = compact_frame(df)
     return df
 
-def to_pandas_edges_arrows(G, pos, arrow_length, **kwargs):
+
+def _value_kind(value):
+    if isinstance(value, (bool, np.bool_)):
+        return 'bool'
+    elif isinstance(value, (int, np.integer)):
+        return 'int'
+    elif isinstance(value, (float, np.floating)):
+        return 'float'
+    return 'object'
+
+
+def _attribute_dtypes(records, attributes=None):
+    """Column dtype of every attribute in a sequence of attribute
+    dictionaries (or of those in ``attributes``), in order of first
+    appearance.
+
+    Integers stay integers only when every record holds one; numbers are
+    otherwise widened to float64 and booleans to the nullable 'boolean'
+    dtype, so that every chunk of a stream agrees on the types of its
+    columns whatever part of the values it holds. Other attributes get
+    object columns.
+    """
+    wanted = None if attributes is None else set(attributes)
+    kinds = {} if attributes is None else {name: set() for name in attributes}
+    counts = dict.fromkeys(kinds, 0)
+    total = 0
+    for attrs in records:
+        total += 1
+        for key, value in attrs.items():
+            if wanted is not None and key not in wanted:
+                continue
+            kinds.setdefault(key, set()).add(_value_kind(value))
+            counts[key] = counts.get(key, 0) + 1
+
+    dtypes = {}
+    for name, kind in kinds.items():
+        complete = counts[name] == total
+        if kind == {'int'} and complete:
+            dtypes[name] = 'int64'
+        elif kind and kind <= {'int', 'float'}:
+            dtypes[name] = 'float64'
+        elif kind == {'bool'}:
+            dtypes[name] = 'bool' if complete else 'boolean'
+        else:
+            dtypes[name] = 'object'
+    return dtypes
+
+
+def _fill_attributes(df, dtypes):
+    """Give ``df`` a column for every attribute in ``dtypes``, after its
+    other columns and in that order, so that all chunks of a stream share
+    their columns. Columns are cast to their dtype when it is given;
+    missing ones hold None, so that file writers don't take a type for
+    them from an empty chunk.
+    """
+    attributes = list(dtypes)
+    for name, dtype in dtypes.items():
+        if name not in df.columns:
+            df[name] = None
+        if dtype is not None:
+            df[name] = df[name].astype(dtype)
+    fixed = [name for name in df.columns if name not in attributes]
+    return df[fixed + attributes]
+
+
+def _stream_dtypes(G, data, records, attributes):
+    """Attribute dtypes shared by all chunks of a stream, see
+    ``_attribute_dtypes``. ArrayGraph columns already have one dtype.
+    """
+    if isinstance(G, ArrayGraph):
+        names = data.columns if attributes is None else attributes
+        return dict.fromkeys(names)
+    return _attribute_dtypes(records, attributes)
+
+
+def iter_pandas_nodes(G, pos, nodelist=None, chunksize=100000, attributes=None,
+                      node_key='node'):
+    """Yield the rows of ``to_pandas_nodes`` in DataFrames of at most
+    ``chunksize`` nodes, so that only one chunk is held in memory.
+
+    Every chunk has the same columns in the same order: the node id as
+    ``node_key`` (unless it is None), the positions and a column for each
+    name in ``attributes``. A first pass over the selected nodes collects
+    the attributes, when ``attributes`` is None, and the column types that
+    every chunk is cast to.
+    """
+    G = as_graph(G)
+    if not isinstance(pos, dict):
+        pos = as_positions(pos, G)
+
+    if nodelist is not None:
+        nodelist = list(nodelist)
+    dtypes = _stream_dtypes(
+        G, G.node_data if isinstance(G, ArrayGraph) else None,
+        (attrs for _, attrs in _select_nodes(G, nodelist)), attributes)
+    attributes = list(dtypes)
+
+    nodes = iter(G.nodes() if nodelist is None else nodelist)
+    while True:
+        chunk = list(itertools.islice(nodes, chunksize))
+        if not chunk:
+            return
+        df = to_pandas_nodes(G, pos, nodelist=chunk, attributes=attributes)
+        df = _fill_attributes(df, dtypes)
+        if node_key is not None:
+            df.insert(0, node_key, df.index)
+        yield df
+
+
+def iter_pandas_edges(G, pos, edgelist=None, chunksize=100000,
+                      attributes=None, edge_format='lines'):
+    """Yield the rows of ``to_pandas_edges`` in DataFrames of at most
+    ``chunksize`` edges, so that only one chunk is held in memory.
+
+    With edge_format='rules' the chunks follow ``to_pandas_edge_segments``
+    instead, one row per edge. Edge ids run on across chunks, the pair
+    column is left out and every chunk has the same columns in the same
+    order, with one for each name in ``attributes``. A first pass over the
+    selected edges collects the attributes, when ``attributes`` is None,
+    and the column types that every chunk is cast to.
+    """
+    if edge_format not in ('lines', 'rules'):
+        raise Exception("edge_format must be 'lines' or 'rules'.")
+
+    G = as_graph(G)
+    if not isinstance(pos, dict):
+        pos = as_positions(pos, G)
+
+    if edgelist is not None:
+        edgelist = list(edgelist)
+    dtypes = _stream_dtypes(
+        G, G.edge_data if isinstance(G, ArrayGraph) else None,
+        (attrs for _, _, attrs in _select_edges(G, edgelist)), attributes)
+    attributes = list(dtypes)
+
+    if isinstance(G, ArrayGraph):
+        codes = G.edge_codes(edgelist)
+        chunks = (codes[i:i + chunksize] for i in range(0, len(codes), chunksize))
+    else:
+        edges = _select_edges(G, edgelist)
+        chunks = iter(lambda: list(itertools.islice(edges, chunksize)), [])
+
+    start = 0
+    for chunk in chunks:
+        if isinstance(G, ArrayGraph):
+            df = _array_edge_frame(G, chunk, attributes, pair=False, start=start)
+            source_xy, target_xy = _endpoint_positions(G, pos, df, chunk)
+        else:
+            df = _record_edge_frame(chunk, attributes, pair=False, start=start)
+            source_xy, target_xy = _endpoint_positions(G, pos, df)
+        start += len(df)
+
+        if edge_format == 'lines':
+            df = _interleave_rows(df, source_xy, target_xy)
+        else:
+            df = _segment_rows(df, source_xy, target_xy)
+        yield _fill_attributes(df, dtypes)
+
+
+def arrows_from_edges(df_edges, arrow_length):
+    """Derive the arrow DataFrame from an edge DataFrame built by
+    ``to_pandas_edges`` or ``to_pandas_edge_segments``.
+
+    Each arrow runs from the target node to a point ``arrow_length`` of the
+    way back along the edge toward its source, written in the same layout
+    (two rows or one segment row per edge) as ``df_edges``.
+    """
+    df = df_edges.copy()
+
+    if 'x2' in df_edges.columns:
+        source_xy = df_edges[['x', 'y']].to_numpy(dtype=float)
+        target_xy = df_edges[['x2', 'y2']].to_numpy(dtype=float)
+        tail_xy = target_xy - arrow_length * (target_xy - source_xy)
+
+        dtype = df_edges['x'].dtype
+        df['x'] = target_xy[:, 0].astype(dtype)
+        df['y'] = target_xy[:, 1].astype(dtype)
+        df['x2'] = tail_xy[:, 0].astype(dtype)
+        df['y2'] = tail_xy[:, 1].astype(dtype)
+        return df
+
+    xy = df_edges[['x', 'y']].to_numpy(dtype=float)
+    source_xy, target_xy = xy[0::2], xy[1::2]
+    tail_xy = target_xy - arrow_length * (target_xy - source_xy)
+
+    xy = _interleave(target_xy, tail_xy).astype(df_edges['x'].dtype)
+    df['x'] = xy[:, 0]
+    df['y'] = xy[:, 1]
+    return df
+
+
+def to_pandas_edges_arrows(G, pos, arrow_length, edgelist=None,
+                           attributes=None, **kwargs):
     """Convert Graph edges to pandas DataFrame that's readable to Altair.
+
+    Each edge is written as two rows, the target node and a point
+    ``arrow_length`` of the way back along the edge toward its source.
     """
-    # Get all attributes in nodes
-    attributes = ['source', 'target', 'x', 'y', 'edge', 'pair']
-    for e in G.edges():
-        attributes += list(G.edges[e].keys())
-    attributes = list(set(attributes))
+    df_edges = to_pandas_edges(
+        G, pos, edgelist=edgelist, attributes=attributes)
+    return arrows_from_edges(df_edges, arrow_length)
 
 
-    # Build a dataframe for all edges and their attributes
-    df = pd.DataFrame(
-        index=range(G.size()*2),
-        columns=attributes
-    )
+def subset_edges(df_edges, edgelist):
+    """Select the rows of an edge DataFrame whose (source, target) pair is
+    in edgelist, using a hashed lookup on the pair.
+    """
+    edgelist = list(edgelist)
+    if not edgelist:
+        return df_edges.iloc[:0]
 
+    pairs = pd.MultiIndex.from_arrays([df_edges['source'], df_edges['target']])
+    keys = pd.MultiIndex.from_tuples([(e[0], e[1]) for e in edgelist])
+    return df_edges.loc[pairs.isin(keys)]
 
-    # Add node data to dataframe.
-    for i, e in enumerate(G.edges):
-        idx = i*2
-        Dy = pos[e[1]][1]-pos[e[0]][1]
-        Dx = pos[e[1]][0]-pos[e[0]][0]
-
-        data1 = dict(
-            edge=i,
-            source=e[0],
-            target=e[1],
-            pair=e,
-            x=pos[e[1]][0],
-            y=pos[e[1]][1],
-            **G.edges[e]
-        )
 
-        data2 = dict(
-            edge=i,
-            source=e[0],
-            target=e[1],
-            pair=e,
-            x=pos[e[1]][0]-arrow_length*Dx,
-            y=pos[e[1]][1]-arrow_length*Dy,
-            **G.edges[e]
+def _grid_extent(x, y, extent=None):
+    """(xmin, xmax, ymin, ymax) of the points, padded when degenerate."""
+    if extent is None and len(x) == 0:
+        extent = (0, 0, 0, 0)
+    elif extent is None:
+        extent = (np.min(x), np.max(x), np.min(y), np.max(y))
+    xmin, xmax, ymin, ymax = [float(v) for v in extent]
+    if xmax <= xmin:
+        xmin, xmax = xmin - .5, xmax + .5
+    if ymax <= ymin:
+        ymin, ymax = ymin - .5, ymax + .5
+    return xmin, xmax, ymin, ymax
+
+
+def _grid_frame(counts, extent):
+    """DataFrame of the non-empty cells of a 2-D count grid, with the cell
+    bounds in x/x2/y/y2 and the count in a 'count' column.
+    """
+    xmin, xmax, ymin, ymax = extent
+    xedges = np.linspace(xmin, xmax, counts.shape[0] + 1)
+    yedges = np.linspace(ymin, ymax, counts.shape[1] + 1)
+    i, j = np.nonzero(counts)
+    return pd.DataFrame({
+        'x': xedges[i],
+        'x2': xedges[i + 1],
+        'y': yedges[j],
+        'y2': yedges[j + 1],
+        'count': counts[i, j],
+    })
+
+
+def density_grid(x, y, bins=128, extent=None):
+    """Count points on a ``bins`` x ``bins`` grid.
+
+    Parameters
+    ----------
+    x, y : array-like
+       Point coordinates.
+
+    bins : int, optional (default=128)
+       Number of cells along each axis.
+
+    extent : tuple, optional (default=None)
+       (xmin, xmax, ymin, ymax) covered by the grid. Defaults to the
+       bounding box of the points.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+       One row per non-empty cell, see ``_grid_frame``.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    extent = _grid_extent(x, y, extent)
+    counts, _, _ = np.histogram2d(
+        x, y, bins=bins, range=[extent[:2], extent[2:]])
+    return _grid_frame(counts.astype(np.int64), extent)
+
+
+def segment_density(x, y, x2, y2, bins=128, extent=None, chunksize=1000000):
+    """Count the straight segments (x, y)-(x2, y2) crossing each cell of a
+    ``bins`` x ``bins`` grid.
+
+    Every segment is sampled at two points per cell along its length, so
+    that samples don't sit on cell edges where rounding could skip a cell,
+    and a segment adds at most one to each cell it passes through.
+    Segments are rasterized ``chunksize`` sample points at a time.
+
+    Parameters
+    ----------
+    x, y, x2, y2 : array-like
+       Segment end points.
+
+    bins : int, optional (default=128)
+       Number of cells along each axis.
+
+    extent : tuple, optional (default=None)
+       (xmin, xmax, ymin, ymax) covered by the grid. Defaults to the
+       bounding box of the segments.
+
+    chunksize : int, optional (default=1000000)
+       Upper bound on the sample points held in memory at once.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+       One row per non-empty cell, see ``_grid_frame``.
+    """
+    x, y, x2, y2 = [np.asarray(a, dtype=float) for a in (x, y, x2, y2)]
+    if extent is not None:
+        # Only sample the part of each segment inside the grid.
+        inside, t0, t1 = clip_segments(x, y, x2, y2, extent)
+        dx, dy = x2 - x, y2 - y
+        t0, t1 = t0[inside], t1[inside]
+        x, y, x2, y2, dx, dy = [a[inside] for a in (x, y, x2, y2, dx, dy)]
+        x, y, x2, y2 = x + t0 * dx, y + t0 * dy, x + t1 * dx, y + t1 * dy
+    extent = _grid_extent(
+        np.concatenate([x, x2]), np.concatenate([y, y2]), extent)
+    xmin, xmax, ymin, ymax = extent
+    width = (xmax - xmin) / bins
+    height = (ymax - ymin) / bins
+
+    # Samples per segment: at most half a cell apart, so at least one
+    # lands well inside every cell the segment crosses.
+    steps = np.maximum(np.abs(x2 - x) / width, np.abs(y2 - y) / height)
+    samples = np.ceil(2 * steps).astype(np.int64) + 1
+
+    counts = np.zeros(bins * bins, dtype=np.int64)
+    total = np.cumsum(samples)
+    start = 0
+    while start < len(x):
+        done = total[start - 1] if start else 0
+        stop = max(start + 1, int(np.searchsorted(
+            total, done + chunksize, side='right')))
+
+        n = samples[start:stop]
+        segment = np.repeat(np.arange(start, stop), n)
+        offset = np.arange(len(segment)) - np.repeat(np.cumsum(n) - n, n)
+        t = offset / np.maximum(np.repeat(n, n) - 1, 1)
+
+        px = x[segment] + t * (x2[segment] - x[segment])
+        py = y[segment] + t * (y2[segment] - y[segment])
+        i = np.clip(((px - xmin) / width).astype(np.int64), 0, bins - 1)
+        j = np.clip(((py - ymin) / height).astype(np.int64), 0, bins - 1)
+
+        # Count each (segment, cell) pair once. A straight segment never
+        # comes back to a cell, so repeats are always consecutive samples.
+        cell = i * bins + j
+        first = np.ones(len(cell), dtype=bool)
+        first[1:] = (cell[1:] != cell[:-1]) | (segment[1:] != segment[:-1])
+        counts += np.bincount(cell[first], minlength=bins * bins)
+        start = stop
+
+    return _grid_frame(counts.reshape(bins, bins), extent)
+
+
+class GraphFrame(object):
+    """Node and edge tables of a graph, each built at most once.
+
+    ``draw_networkx`` creates one per call and hands it to every layer, so
+    the nodes and labels layers share a node table and the arrows layer
+    reuses the edge table instead of converting G again.
+
+    Parameters
+    ----------
+    G : graph
+       A networkx graph
+
+    pos : dictionary
+       A dictionary with nodes as keys and positions as values.
+
+    nodelist : list, optional
+       Build the node table for these nodes only (default G.nodes())
+
+    edgelist : list, optional
+       Build the edge table for these edges only (default G.edges())
+
+    node_key : string, optional
+       When given, the node table gets a column of this name holding the
+       node ids, and one named ``lookup_key`` holding integer node codes
+       that edge tables look up positions by, so ids of any type, such as
+       tuples, can be joined on (default=None)
+
+    compact : bool, optional
+       Build every table with the dtypes of ``compact_frame`` (default=False)
+
+    node_attributes : collection of strings, optional
+       Node attributes to copy into the node table (default=None, all)
+
+    edge_attributes : collection of strings, optional
+       Edge attributes to copy into the edge tables (default=None, all)
+
+    data_sink : callable, optional
+       Turns a table into chart data, such as a ``data.DataExporter``
+       (default=None, tables are inlined in the chart)
+
+    extent : tuple, optional
+       (xmin, xmax, ymin, ymax) spanned by the density grids, such as the
+       viewport of a zoomed chart (default=None, the positions of all
+       nodes in G)
+    """
+    def __init__(self, G, pos, nodelist=None, edgelist=None, node_key=None,
+                 compact=False, node_attributes=None, edge_attributes=None,
+                 data_sink=None, extent=None):
+        self.G = as_graph(G)
+        self.pos = as_positions(pos, self.G)
+        self.nodelist = nodelist
+        self.edgelist = edgelist
+        self.node_key = node_key
+        self.compact = compact
+        self.node_attributes = node_attributes
+        self.edge_attributes = edge_attributes
+        self.data_sink = data_sink
+        self._data = {}
+        self._nodes = None
+        self._lookup_nodes = None
+        self._node_index = None
+        self._edges = None
+        self._segments = None
+        self._edge_ids = None
+        self._density = {}
+        self._extent = None
+        if extent is not None:
+            self._extent = _grid_extent([], [], extent)
+
+    @property
+    def nodes(self):
+        """DataFrame of nodes, see ``to_pandas_nodes``."""
+        if self._nodes is None:
+            self._nodes = self._node_table(self.nodelist)
+        return self._nodes
+
+    def _node_table(self, nodelist):
+        df = to_pandas_nodes(
+            self.G, self.pos,
+            nodelist=nodelist,
+            compact=self.compact,
+            attributes=self.node_attributes
         )
+        if self.node_key is not None:
+            df.insert(0, self.node_key, df.index)
+            df.insert(1, self.lookup_key, self._node_codes(df.index))
+        return df
 
-        df.loc[idx] = data1
-        df.loc[idx+1] = data2
+    @property
+    def lookup_key(self):
+        """Name of the integer node code column that edge tables look up
+        node positions by, or None without a node_key.
+        """
+        if self.node_key is None:
+            return None
+        return self.node_key + '_code'
 
-    return df
+    def _node_codes(self, nodes):
+        """Position of every node in ``nodes`` among the nodes of G, as
+        compact integers when the frame is compact.
+        """
+        if self._node_index is None:
+            if isinstance(self.G, ArrayGraph):
+                self._node_index = self.G.node_index
+            else:
+                self._node_index = pd.Index(list(self.G), tupleize_cols=False)
+        codes = self._node_index.get_indexer(
+            pd.Index(list(nodes), tupleize_cols=False))
+        if self.compact:
+            codes = pd.to_numeric(codes, downcast='integer')
+        return codes
+
+    @property
+    def lookup_nodes(self):
+        """DataFrame that edge tables look up node positions in.
+
+        This is the node table itself when every node is drawn, so the
+        nodes layer and the lookup share one dataset. Otherwise it holds
+        the id and position of every node in G, or of every end point of
+        the edge table when an edgelist is given.
+        """
+        if self.node_key is None:
+            raise Exception("GraphFrame needs a node_key to look up nodes.")
+
+        if self._lookup_nodes is None:
+            if self.nodelist is None:
+                self._lookup_nodes = self.nodes
+            else:
+                nodelist = None
+                if self.edgelist is not None:
+                    nodelist = list(pd.unique(np.concatenate([
+                        np.asarray(self.edge_ids['source'], dtype=object),
+                        np.asarray(self.edge_ids['target'], dtype=object),
+                    ])))
+                df = self._node_table(nodelist)
+                self._lookup_nodes = df[[self.node_key, self.lookup_key, 'x', 'y']]
+        return self._lookup_nodes
+
+    @property
+    def edges(self):
+        """DataFrame of edges, see ``to_pandas_edges``."""
+        if self._edges is None:
+            self._edges = to_pandas_edges(
+                self.G, self.pos,
+                edgelist=self.edgelist,
+                compact=self.compact,
+                attributes=self.edge_attributes
+            )
+        return self._edges
+
+    @property
+    def segments(self):
+        """DataFrame of edges, one row each, see ``to_pandas_edge_segments``."""
+        if self._segments is None:
+            self._segments = to_pandas_edge_segments(
+                self.G, self.pos,
+                edgelist=self.edgelist,
+                compact=self.compact,
+                attributes=self.edge_attributes
+            )
+        return self._segments
+
+    @property
+    def edge_ids(self):
+        """DataFrame of edges without positions, see ``to_pandas_edge_ids``.
+
+        With a node_key, the integer codes of the end points are added as
+        source_code and target_code for the lookup of their positions.
+        """
+        if self._edge_ids is None:
+            df = to_pandas_edge_ids(
+                self.G,
+                edgelist=self.edgelist,
+                compact=self.compact,
+                attributes=self.edge_attributes
+            )
+            if self.node_key is not None:
+                df.insert(3, 'source_code', self._node_codes(df['source']))
+                df.insert(4, 'target_code', self._node_codes(df['target']))
+            self._edge_ids = df
+        return self._edge_ids
+
+    def edge_table(self, edge_format='lines'):
+        """DataFrame of edges in the given format.
+
+        'lines' gives two rows per edge (``edges``), 'rules' gives one row
+        per edge with x/y/x2/y2 columns (``segments``) and 'lookup' gives
+        one row per edge without positions (``edge_ids``).
+        """
+        if edge_format == 'lines':
+            return self.edges
+        elif edge_format == 'rules':
+            return self.segments
+        elif edge_format == 'lookup':
+            return self.edge_ids
+        raise Exception("edge_format must be 'lines', 'rules' or 'lookup'.")
+
+    @property
+    def extent(self):
+        """(xmin, xmax, ymin, ymax) of the density grids: the extent given
+        to the frame, or that of the positions of all nodes in G.
+        """
+        if self._extent is None:
+            xy = node_positions(self.G, self.pos)
+            self._extent = _grid_extent(xy[:, 0], xy[:, 1])
+        return self._extent
+
+    def density(self, elements='nodes', bins=128):
+        """Count grid of node positions or edge segments, see
+        ``density_grid`` and ``segment_density``.
+
+        Both grids span ``extent``, so their cells line up.
+        """
+        key = (elements, bins)
+        if key not in self._density:
+            if elements == 'nodes':
+                df = self.nodes
+                self._density[key] = density_grid(
+                    df['x'], df['y'], bins=bins, extent=self.extent)
+            elif elements == 'edges':
+                df = self.segments
+                self._density[key] = segment_density(
+                    df['x'], df['y'], df['x2'], df['y2'],
+                    bins=bins, extent=self.extent)
+            else:
+                raise Exception("elements must be 'nodes' or 'edges'.")
+        return self._density[key]
+
+    def data(self, df, name='data'):
+        """Chart data for one of this frame's tables.
+
+        Without a ``data_sink`` this is ``df`` itself. Otherwise the sink is
+        called once per table and its result reused by every layer.
+        """
+        if self.data_sink is None:
+            return df
+
+        if id(df) not in self._data:
+            self._data[id(df)] = (df, self.data_sink(df, name))
+        return self._data[id(df)][1]
+
+    def memory_usage(self):
+        """Memory used by each table built so far, in bytes.
+
+        Returns a pandas Series indexed by table name; density tables are
+        named after their elements and number of bins.
+        """
+        tables = dict(
+            nodes=self._nodes,
+            lookup_nodes=self._lookup_nodes,
+            edges=self._edges,
+            segments=self._segments,
+            edge_ids=self._edge_ids,
+        )
+        for (elements, bins), df in self._density.items():
+            tables['density {} {}'.format(elements, bins)] = df
+
+        return pd.Series({
+            name: df.memory_usage(index=True, deep=True).sum()
+            for name, df in tables.items()
+            if df is not None
+        }, dtype='int64')
 
 
 def to_chart(G, pos):
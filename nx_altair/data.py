@@ -0,0 +1,390 @@
+import io
+import os
+import math
+import hashlib
+import tempfile
+import threading
+import functools
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import altair as alt
+
+
+def _to_csv(df, sep=','):
+    return df.to_csv(index=False, sep=sep).encode('utf-8')
+
+
+def _to_json(df):
+    return df.to_json(orient='records', double_precision=15).encode('utf-8')
+
+
+def _to_arrow(df):
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        raise ImportError("The 'arrow' format requires pyarrow.")
+
+    buffer = io.BytesIO()
+    feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), buffer)
+    return buffer.getvalue()
+
+
+# Writers by format: (serializer, file extension, Vega-Lite format type)
+FORMATS = {
+    'csv': (_to_csv, 'csv', 'csv'),
+    'tsv': (functools.partial(_to_csv, sep='\t'), 'tsv', 'tsv'),
+    'json': (_to_json, 'json', 'json'),
+    'arrow': (_to_arrow, 'arrow', 'arrow'),
+}
+
+
+class DataExporter(object):
+    """Write chart data to sidecar files instead of inlining it in the spec.
+
+    Every DataFrame is serialized once, named by a hash of its contents and
+    referenced from the chart with ``alt.UrlData``, so the size of the
+    chart spec no longer grows with the size of the graph.
+
+    Parameters
+    ----------
+    directory : string
+       Directory to write files to. Created if missing.
+
+    format : string, optional (default='csv')
+       One of 'csv', 'tsv', 'json' or 'arrow'. 'arrow' needs pyarrow, and
+       the page rendering the chart needs the vega-loader-arrow plugin.
+
+    url : string, optional (default=None)
+       URL under which ``directory`` is reachable from the page rendering
+       the chart. Defaults to the directory path itself, or to the URL of a
+       local server when ``serve=True``.
+
+    serve : bool, optional (default=False)
+       Start a local static-file server for ``directory``, see
+       ``serve_directory``.
+    """
+    def __init__(self, directory, format='csv', url=None, serve=False):
+        if format not in FORMATS:
+            raise Exception("format must be one of {}.".format(
+                ", ".join(sorted(FORMATS))))
+
+        self.directory = directory
+        self.format = format
+        self.server = None
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        if url is None and serve:
+            self.server = serve_directory(directory)
+            url = self.server.url
+        elif url is None:
+            url = directory
+        self.url = url if url.endswith('/') else url + '/'
+
+    def __call__(self, df, name='data'):
+        """Write ``df`` and return an ``alt.UrlData`` pointing at it."""
+        serialize, extension, vl_type = FORMATS[self.format]
+
+        # Tuple-valued columns such as 'pair' don't survive the file formats.
+        df = df.drop(columns='pair', errors='ignore')
+        content = serialize(df)
+
+        filename = '{}-{}.{}'.format(
+            name, hashlib.sha1(content).hexdigest()[:16], extension)
+        path = os.path.join(self.directory, filename)
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(content)
+
+        return alt.UrlData(
+            url=self.url + filename,
+            format=alt.DataFormat(type=vl_type)
+        )
+
+    def close(self):
+        """Stop the local server, if one was started."""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def _write_csv_chunks(chunks, f, sep=','):
+    header = True
+    for df in chunks:
+        f.write(df.to_csv(index=False, header=header, sep=sep).encode('utf-8'))
+        header = False
+
+
+def _write_json_chunks(chunks, f):
+    # One JSON array, written record batch by record batch.
+    f.write(b'[')
+    first = True
+    for df in chunks:
+        if len(df) == 0:
+            continue
+        records = _to_json(df)[1:-1]
+        f.write(records if first else b',' + records)
+        first = False
+    f.write(b']')
+
+
+def _write_ndjson_chunks(chunks, f):
+    for df in chunks:
+        if len(df):
+            content = df.to_json(orient='records', lines=True, double_precision=15)
+            f.write(content.rstrip('\n').encode('utf-8') + b'\n')
+
+
+def _write_parquet_chunks(chunks, f):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("The 'parquet' format requires pyarrow.")
+
+    def has_nulls(schema):
+        return any(pa.types.is_null(field.type) for field in schema)
+
+    # Columns that are empty in the first chunks have no type yet, so
+    # those chunks are held back until every column has one, or the end.
+    # Types are widened across held chunks; the chunk iterators give
+    # attribute columns one type for the whole stream.
+    writer = None
+    pending = []
+    try:
+        for df in chunks:
+            if writer is not None:
+                writer.write_table(pa.Table.from_pandas(
+                    df, schema=writer.schema, preserve_index=False))
+                continue
+
+            pending.append(pa.Table.from_pandas(df, preserve_index=False))
+            schema = pa.unify_schemas(
+                [table.schema for table in pending], promote_options='permissive')
+            if not has_nulls(schema):
+                writer = pq.ParquetWriter(f, schema)
+                for table in pending:
+                    writer.write_table(table.cast(schema))
+                pending = []
+
+        if pending:
+            writer = pq.ParquetWriter(f, schema)
+            for table in pending:
+                writer.write_table(table.cast(schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+# Chunk writers by format: (writer, file extension, Vega-Lite format type);
+# Vega-Lite has no format type for the last two.
+STREAM_FORMATS = {
+    'csv': (_write_csv_chunks, 'csv', 'csv'),
+    'tsv': (functools.partial(_write_csv_chunks, sep='\t'), 'tsv', 'tsv'),
+    'json': (_write_json_chunks, 'json', 'json'),
+    'ndjson': (_write_ndjson_chunks, 'ndjson', None),
+    'parquet': (_write_parquet_chunks, 'parquet', None),
+}
+
+
+class StreamExporter(DataExporter):
+    """Write chart data to sidecar files one chunk at a time.
+
+    Takes an iterable of DataFrames, such as ``core.iter_pandas_nodes`` or
+    ``core.iter_pandas_edges``, and appends each one to a single file, so
+    the table as a whole is never held in memory. As with
+    ``DataExporter``, files are named by a hash of their contents and
+    referenced from the chart with ``alt.UrlData``.
+
+    Parameters
+    ----------
+    directory : string
+       Directory to write files to. Created if missing.
+
+    format : string, optional (default='csv')
+       One of 'csv', 'tsv', 'json', 'ndjson' or 'parquet'. 'parquet'
+       needs pyarrow. Vega reads the first three; 'ndjson' and 'parquet'
+       files are referenced by URL only, for pages or tools that bring
+       their own loader.
+
+    url : string, optional (default=None)
+       URL under which ``directory`` is reachable from the page rendering
+       the chart. Defaults to the directory path itself, or to the URL of a
+       local server when ``serve=True``.
+
+    serve : bool, optional (default=False)
+       Start a local static-file server for ``directory``, see
+       ``serve_directory``.
+    """
+    def __init__(self, directory, format='csv', url=None, serve=False):
+        if format not in STREAM_FORMATS:
+            raise Exception("format must be one of {}.".format(
+                ", ".join(sorted(STREAM_FORMATS))))
+        super().__init__(directory, url=url, serve=serve)
+        self.format = format
+
+    def __call__(self, chunks, name='data'):
+        """Write every DataFrame in ``chunks`` to one file and return an
+        ``alt.UrlData`` pointing at it.
+        """
+        write, extension, vl_type = STREAM_FORMATS[self.format]
+        if isinstance(chunks, pd.DataFrame):
+            chunks = [chunks]
+        chunks = (df.drop(columns='pair', errors='ignore') for df in chunks)
+
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(chunks, f)
+
+            digest = hashlib.sha1()
+            with open(tmp, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            filename = '{}-{}.{}'.format(
+                name, digest.hexdigest()[:16], extension)
+            os.replace(tmp, os.path.join(self.directory, filename))
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+        if vl_type is None:
+            return alt.UrlData(url=self.url + filename)
+        return alt.UrlData(
+            url=self.url + filename,
+            format=alt.DataFormat(type=vl_type)
+        )
+
+
+# Columns holding layout coordinates, quantized by ``InlineEncoder``.
+COORDINATES = ('x', 'y', 'x2', 'y2')
+
+
+def quantize_coordinates(df, precision=1e-4, extent=None):
+    """Round the coordinate columns of ``df`` to a fraction of the layout.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+       Node or edge table with some of the columns x, y, x2, y2.
+
+    precision : float, optional (default=1e-4)
+       Smallest coordinate step to keep, relative to ``extent``.
+
+    extent : float, optional (default=None)
+       Size of the layout. Defaults to the larger of the x and y ranges
+       found in ``df``.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+       A copy of ``df`` with coordinates rounded to as many decimals as
+       ``precision * extent`` needs.
+    """
+    columns = [c for c in COORDINATES if c in df.columns]
+    if not columns:
+        return df
+
+    if extent is None:
+        xs = df[[c for c in columns if c.startswith('x')]]
+        ys = df[[c for c in columns if c.startswith('y')]]
+        extent = max(
+            float(xs.max().max() - xs.min().min()) if xs.size else 0,
+            float(ys.max().max() - ys.min().min()) if ys.size else 0,
+        )
+    step = precision * (extent if extent > 0 else 1)
+    decimals = max(0, int(math.ceil(-math.log10(step))))
+
+    df = df.copy()
+    for c in columns:
+        # Round in float64 so the printed values are the short decimals.
+        df[c] = df[c].astype('float64').round(decimals)
+    return df
+
+
+class InlineEncoder(object):
+    """Embed chart data inline as a single CSV string.
+
+    Altair inlines a DataFrame as a list of records, repeating every field
+    name on every row and printing coordinates with full float precision.
+    This encoder instead emits one delimited string with a header line and
+    rounds the coordinates to ``precision`` of the layout extent.
+
+    Parameters
+    ----------
+    precision : float, optional (default=1e-4)
+       Smallest coordinate step to keep, relative to the layout extent.
+       Pass None to keep full precision.
+
+    extent : float, optional (default=None)
+       Size of the layout. Defaults to the range of each table's
+       coordinates.
+
+    format : string, optional (default='csv')
+       'csv' or 'tsv'.
+    """
+    def __init__(self, precision=1e-4, extent=None, format='csv'):
+        if format not in ('csv', 'tsv'):
+            raise Exception("format must be 'csv' or 'tsv'.")
+
+        self.precision = precision
+        self.extent = extent
+        self.format = format
+
+    def __call__(self, df, name='data'):
+        """Encode ``df`` and return an ``alt.InlineData``."""
+        df = df.drop(columns='pair', errors='ignore')
+        if self.precision is not None:
+            df = quantize_coordinates(df, self.precision, self.extent)
+
+        serialize = FORMATS[self.format][0]
+        return alt.InlineData(
+            values=serialize(df).decode('utf-8'),
+            format=alt.DataFormat(type=self.format)
+        )
+
+
+class _CORSRequestHandler(SimpleHTTPRequestHandler):
+    """Static file handler that lets charts on other origins load data."""
+    def end_headers(self):
+        self.send_header('Access-Control-Allow-Origin', '*')
+        super().end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_directory(directory, host='127.0.0.1', port=0):
+    """Serve the files in ``directory`` over HTTP from a background thread.
+
+    Parameters
+    ----------
+    directory : string
+       Directory to serve.
+
+    host : string, optional (default='127.0.0.1')
+       Interface to bind to.
+
+    port : int, optional (default=0)
+       Port to bind to; 0 picks a free port.
+
+    Returns
+    -------
+    server : ``http.server.ThreadingHTTPServer``
+       The running server. Its ``url`` attribute holds the base URL; call
+       ``shutdown()`` to stop it.
+    """
+    handler = functools.partial(_CORSRequestHandler, directory=directory)
+    return start_server(ThreadingHTTPServer((host, port), handler))
+
+
+def start_server(server):
+    """Run ``server`` from a daemon thread and set its ``url`` attribute."""
+    server.url = 'http://{}:{}/'.format(*server.server_address[:2])
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -1,9 +1,133 @@
 import numpy as np
 import altair as alt
-import networkx as nx
 
-from .core import to_pandas_edges, to_pandas_edges_arrows, to_pandas_nodes
-from ._utils import is_arraylike
+from .core import GraphFrame, subset_edges
+from .layout import compute_layout
+from .arraygraph import as_graph, as_positions
+from .spatial import _check_viewport, cull
+from .sparsify import sparsify_edges
+from .bundling import bundle_edges, community_labels
+from .matrix import node_order, to_pandas_adjacency
+from ._utils import is_arraylike, infer_vegalite_type
+
+
+def _typed(df, field):
+    """Shorthand for ``field`` with its Vega-Lite type appended, inferred
+    from ``df``, so encodings also work when the chart data is not inlined.
+
+    Lists (tooltips) are typed item by item; anything that is not the name
+    of a column of ``df`` is returned unchanged.
+    """
+    if isinstance(field, list):
+        return [_typed(df, item) for item in field]
+
+    elif isinstance(field, str) and field in df.columns:
+        return '{}:{}'.format(field, infer_vegalite_type(df[field]))
+
+    return field
+
+
+def _encoded_fields(*args):
+    """Return the data fields that encoding arguments may refer to, in the
+    order they are given.
+
+    Arguments can be field names or shorthands ('weight:Q'), lists of them
+    (as for tooltips), ``alt.Tooltip``-like objects or dicts. Plain values
+    such as color names are returned too; builders skip names that are not
+    attributes of the graph.
+    """
+    fields = {}
+    for arg in args:
+        if isinstance(arg, str):
+            fields[alt.utils.parse_shorthand(arg).get('field', arg)] = None
+
+        elif isinstance(arg, (list, tuple)):
+            fields.update(dict.fromkeys(_encoded_fields(*arg)))
+
+        elif isinstance(arg, dict):
+            fields.update(dict.fromkeys(_encoded_fields(arg.get('field'))))
+
+        elif arg is not None:
+            kwds = getattr(arg, '_kwds', {})
+            fields.update(dict.fromkeys(
+                _encoded_fields(kwds.get('field'), kwds.get('shorthand'))))
+    return list(fields)
+
+
+def _lookup_positions(edge_chart, frame):
+    """Join source and target positions onto rows of an edge id table in the
+    browser, as x/y and x2/y2 fields.
+
+    Rows are matched on integer node codes rather than node ids, which
+    may not survive JSON as lookup keys (tuples become arrays).
+    """
+    lookup_data = alt.LookupData(
+        data=frame.data(frame.lookup_nodes, 'nodes'),
+        key=frame.lookup_key,
+        fields=['x', 'y']
+    )
+    return edge_chart.transform_lookup(
+        lookup='source_code',
+        from_=lookup_data,
+        as_=['x', 'y']
+    ).transform_lookup(
+        lookup='target_code',
+        from_=lookup_data,
+        as_=['x2', 'y2']
+    )
+
+
+def _arrow_positions(edge_chart, arrow_length, edge_format):
+    """Derive arrow positions from the rows of an edge table in the browser.
+
+    Each arrow runs from the target node to a point ``arrow_length`` of the
+    way back along the edge toward its source, as in
+    ``core.arrows_from_edges``. Returns the chart with the transforms added
+    and the position fields to encode.
+    """
+    if edge_format == 'lines':
+        # Two rows per edge: spread the source and target positions over
+        # both rows, then put the tail point on the first and the head on
+        # the second.
+        tail = 'datum.rank == 1 ? datum.t{0} - {1} * (datum.t{0} - datum.s{0}) : datum.t{0}'
+        edge_chart = edge_chart.transform_window(
+            rank='row_number()',
+            sx='first_value(x)',
+            sy='first_value(y)',
+            tx='last_value(x)',
+            ty='last_value(y)',
+            groupby=['edge'],
+            frame=[None, None]
+        ).transform_calculate(
+            ax=tail.format('x', arrow_length),
+            ay=tail.format('y', arrow_length),
+        )
+        return edge_chart, dict(x='ax', y='ay', detail='edge:N')
+
+    edge_chart = edge_chart.transform_calculate(
+        x3='datum.x2 - {0} * (datum.x2 - datum.x)'.format(arrow_length),
+        y3='datum.y2 - {0} * (datum.y2 - datum.y)'.format(arrow_length),
+    )
+    return edge_chart, dict(x='x2', y='y2', x2='x3:Q', y2='y3:Q')
+
+
+def _zoom(chart, viewport):
+    """Fix the x and y scales of every layer of ``chart`` to ``viewport``
+    and clip marks to it, so edges crossing the view end at its border.
+    """
+    xmin, xmax, ymin, ymax = _check_viewport(viewport)
+    for layer in chart.layer:
+        mark = layer.mark
+        if isinstance(mark, str):
+            mark = alt.MarkDef(type=mark)
+        mark.clip = True
+        layer.mark = mark
+        for channel, domain in (('x', [xmin, xmax]), ('y', [ymin, ymax])):
+            encoding = getattr(layer.encoding, channel, alt.Undefined)
+            if encoding is not alt.Undefined:
+                encoding.scale = alt.Scale(domain=domain)
+    return chart
+
 
 def draw_networkx_edges(
     G=None,
@@ -17,6 +141,8 @@ def draw_networkx_edges(
     edge_cmap=None,
     tooltip=None,
     legend=False,
+    edge_format='lines',
+    frame=None,
     **kwargs):
     """Draw the edges of the graph G.
 
@@ -51,37 +177,61 @@ def draw_networkx_edges(
     edge_cmap : Matplotlib colormap
        Colormap for mapping intensities of edges (default=None)
 
+    edge_format : 'lines', 'rules' or 'lookup'
+       How edges are written to the chart data (default='lines'). 'lines'
+       uses two rows per edge drawn with ``mark_line``; 'rules' uses a
+       single row per edge with x/y/x2/y2 columns drawn with ``mark_rule``,
+       which halves the number of rows for straight edges; 'lookup' stores
+       only source/target ids per edge and looks up their positions in the
+       node table in the browser.
+
+    frame : GraphFrame, optional
+       Node and edge tables already built from G and pos. Shared between
+       layers by ``draw_networkx`` (default=None, built from G and pos
+       with only the attributes that this layer's arguments refer to).
+
     Returns
     -------
     viz: ``altair.Chart`` object
     """
+    ###### edge list argument
+    if edgelist is not None and not isinstance(edgelist, list):
+        raise Exception("edgelist must be a list or None.")
+
     if chart is None:
-        # Pandas dataframe of edges
-        df_edges = to_pandas_edges(G, pos)
+        # Pandas dataframe of the requested edges only
+        if frame is None:
+            frame = GraphFrame(
+                G, pos,
+                edgelist=edgelist,
+                node_key='node',
+                node_attributes=(),
+                edge_attributes=_encoded_fields(
+                    width, edge_color, alpha, tooltip)
+            )
+        df_edges = frame.edge_table(edge_format)
 
         # Build a chart
-        edge_chart = alt.Chart(df_edges)
+        edge_chart = alt.Chart(frame.data(df_edges, 'edges'))
+        if edge_format == 'lookup':
+            edge_chart = _lookup_positions(edge_chart, frame)
     else:
         df_edges = chart.layer[0].data
         edge_chart = chart.layer[0]
 
+        if edgelist is not None:
+            # Subset dataframe.
+            df_edges = subset_edges(df_edges, edgelist)
+            edge_chart = edge_chart.properties(data=df_edges)
+
     marker_attrs = {}
     encoded_attrs = {}
 
     # ---------- Handle arguments ------------
 
-    ###### node list argument
-    if isinstance(edgelist, list):
-        # Subset dataframe.
-        df_edges = df_edges.loc[df_edges['pair'].isin(edgelist)]
-
-    elif edgelist is not None:
-        raise Exception("nodelist must be a list or None.")
-
-
     ###### Node size
     if isinstance(width, str):
-        encoded_attrs["size"] = alt.Size(width, legend=None)
+        encoded_attrs["size"] = alt.Size(_typed(df_edges, width), legend=None)
 
     elif isinstance(width, float) or isinstance(width, int):
         marker_attrs["strokeWidth"] = width
@@ -94,14 +244,14 @@ def draw_networkx_edges(
         raise Exception("edge_color must be a string.")
 
     elif edge_color in df_edges.columns:
-        encoded_attrs["color"] = alt.Color(edge_color, legend=None)
+        encoded_attrs["color"] = alt.Color(_typed(df_edges, edge_color), legend=None)
 
     else:
         marker_attrs["color"] = edge_color
 
     ##### alpha
     if isinstance(alpha, str):
-        encoded_attrs["opacity"] = alpha
+        encoded_attrs["opacity"] = _typed(df_edges, alpha)
 
     elif isinstance(alpha, int) or isinstance(alpha, float):
         marker_attrs["opacity"] = alpha
@@ -112,7 +262,7 @@ def draw_networkx_edges(
     ##### alpha
     if isinstance(edge_cmap, str):
         encoded_attrs["color"] = alt.Color(
-            edge_color,
+            _typed(df_edges, edge_color),
             scale=alt.Scale(scheme=edge_cmap, legend=None),
             legend=None)
 
@@ -120,17 +270,26 @@ def draw_networkx_edges(
         raise Exception("edge_cmap must be a string (colormap name) or None.")
 
     if tooltip is not None:
-        encoded_attrs['tooltip'] = tooltip
+        encoded_attrs['tooltip'] = _typed(df_edges, tooltip)
 
     # ---------- Construct visualization ------------
 
     # Draw edges
-    edge_chart = edge_chart.mark_line(**marker_attrs).encode(
-        x=alt.X('x', axis=alt.Axis(title='', grid=False, labels=False, ticks=False)),
-        y=alt.Y('y', axis=alt.Axis(title='', grid=False, labels=False, ticks=False)),
-        detail='edge',
-        **encoded_attrs
-    )
+    if 'x2' in df_edges.columns or edge_format == 'lookup':
+        edge_chart = edge_chart.mark_rule(**marker_attrs).encode(
+            x=alt.X('x:Q', axis=alt.Axis(title='', grid=False, labels=False, ticks=False)),
+            y=alt.Y('y:Q', axis=alt.Axis(title='', grid=False, labels=False, ticks=False)),
+            x2='x2:Q',
+            y2='y2:Q',
+            **encoded_attrs
+        )
+    else:
+        edge_chart = edge_chart.mark_line(**marker_attrs).encode(
+            x=alt.X('x:Q', axis=alt.Axis(title='', grid=False, labels=False, ticks=False)),
+            y=alt.Y('y:Q', axis=alt.Axis(title='', grid=False, labels=False, ticks=False)),
+            detail='edge:N',
+            **encoded_attrs
+        )
 
     if chart is not None:
         chart.layer[0] = edge_chart
@@ -151,6 +310,8 @@ def draw_networkx_arrows(
     edge_cmap=None,
     tooltip=None,
     legend=False,
+    edge_format='lines',
+    frame=None,
     **kwargs):
     """Draw the edges of the graph G.
 
@@ -188,37 +349,69 @@ def draw_networkx_arrows(
     edge_cmap : Matplotlib colormap
        Colormap for mapping intensities of edges (default=None)
 
+    edge_format : 'lines', 'rules' or 'lookup'
+       How edges are written to the chart data (default='lines'). 'lines'
+       uses two rows per edge drawn with ``mark_line``; 'rules' uses a
+       single row per edge with x/y/x2/y2 columns drawn with ``mark_rule``,
+       which halves the number of rows for straight edges; 'lookup' stores
+       only source/target ids per edge and looks up their positions in the
+       node table in the browser.
+
+    frame : GraphFrame, optional
+       Node and edge tables already built from G and pos. Shared between
+       layers by ``draw_networkx`` (default=None, built from G and pos
+       with only the attributes that this layer's arguments refer to).
+
     Returns
     -------
     viz: ``altair.Chart`` object
     """
-    if chart is None:
-        # Pandas dataframe of edges
-        df_edge_arrows = to_pandas_edges_arrows(G, pos, arrow_length)
+    ###### edge list argument
+    if edgelist is not None and not isinstance(edgelist, list):
+        raise Exception("edgelist must be a list or None.")
 
-        # Build a chart
-        edge_chart = alt.Chart(df_edge_arrows)
+    if chart is None:
+        # Pandas dataframe of the requested edges only
+        if frame is None:
+            frame = GraphFrame(
+                G, pos,
+                edgelist=edgelist,
+                node_key='node',
+                node_attributes=(),
+                edge_attributes=_encoded_fields(
+                    arrow_width, edge_color, alpha, tooltip)
+            )
+        df_edge_arrows = frame.edge_table(edge_format)
+
+        # Build a chart on the edge table itself, so that the edge and arrow
+        # layers share one dataset, and derive the arrows in the browser.
+        edge_chart = alt.Chart(frame.data(df_edge_arrows, 'edges'))
+        if edge_format == 'lookup':
+            edge_chart = _lookup_positions(edge_chart, frame)
+        edge_chart, positions = _arrow_positions(
+            edge_chart, arrow_length, edge_format)
     else:
         df_edge_arrows = chart.layer[0].data
         edge_chart = chart.layer[0]
 
+        if edgelist is not None:
+            # Subset dataframe.
+            df_edge_arrows = subset_edges(df_edge_arrows, edgelist)
+            edge_chart = edge_chart.properties(data=df_edge_arrows)
+
+        if 'x2' in df_edge_arrows.columns:
+            positions = dict(x='x', y='y', x2='x2:Q', y2='y2:Q')
+        else:
+            positions = dict(x='x', y='y', detail='edge:N')
+
     marker_attrs = {}
     encoded_attrs = {}
 
     # ---------- Handle arguments ------------
 
-    ###### node list argument
-    if isinstance(edgelist, list):
-        # Subset dataframe.
-        df_edge_arrows = df_edge_arrows.loc[df_edge_arrows['pair'].isin(edgelist)]
-
-    elif edgelist is not None:
-        raise Exception("nodelist must be a list or None.")
-
-
     ###### Node size
     if isinstance(arrow_width, str):
-        encoded_attrs["size"] = alt.Size(arrow_width, legend=None)
+        encoded_attrs["size"] = alt.Size(_typed(df_edge_arrows, arrow_width), legend=None)
 
     elif isinstance(arrow_width, float) or isinstance(arrow_width, int):
         marker_attrs["strokeWidth"] = arrow_width
@@ -231,14 +424,14 @@ def draw_networkx_arrows(
         raise Exception("edge_color must be a string.")
 
     elif edge_color in df_edge_arrows.columns:
-        encoded_attrs["color"] = alt.Color(edge_color, legend=None)
+        encoded_attrs["color"] = alt.Color(_typed(df_edge_arrows, edge_color), legend=None)
 
     else:
         marker_attrs["color"] = edge_color
 
     ##### alpha
     if isinstance(alpha, str):
-        encoded_attrs["opacity"] = alpha
+        encoded_attrs["opacity"] = _typed(df_edge_arrows, alpha)
 
     elif isinstance(alpha, int) or isinstance(alpha, float):
         marker_attrs["opacity"] = alpha
@@ -249,7 +442,7 @@ def draw_networkx_arrows(
     ##### alpha
     if isinstance(edge_cmap, str):
         encoded_attrs["color"] = alt.Color(
-            edge_color,
+            _typed(df_edge_arrows, edge_color),
             scale=alt.Scale(scheme=edge_cmap, legend=None),
             legend=None)
 
@@ -257,18 +450,22 @@ def draw_networkx_arrows(
         raise Exception("edge_cmap must be a string (colormap name) or None.")
 
     if tooltip is not None:
-        encoded_attrs['tooltip'] = tooltip
+        encoded_attrs['tooltip'] = _typed(df_edge_arrows, tooltip)
 
     # ---------- Construct visualization ------------
 
     # Draw edges
-    edge_chart = edge_chart.mark_line(
-        **marker_attrs
-    ).encode(
-        x=alt.X('x', axis=alt.Axis(grid=False, labels=False, ticks=False)),
-        y=alt.Y('y', axis=alt.Axis(grid=False, labels=False, ticks=False)),
-        detail='edge',
-        **encoded_attrs
+    x = positions.pop('x')
+    y = positions.pop('y')
+    if 'x2' in positions:
+        edge_chart = edge_chart.mark_rule(**marker_attrs)
+    else:
+        edge_chart = edge_chart.mark_line(**marker_attrs)
+
+    edge_chart = edge_chart.encode(
+        x=alt.X(x + ':Q', axis=alt.Axis(grid=False, labels=False, ticks=False)),
+        y=alt.Y(y + ':Q', axis=alt.Axis(grid=False, labels=False, ticks=False)),
+        **dict(positions, **encoded_attrs)
     )
 
     if chart is not None:
@@ -289,6 +486,7 @@ def draw_networkx_nodes(
     alpha=1,
     cmap=None,
     tooltip=None,
+    frame=None,
     **kwargs
     ):
     """Draw the nodes of the graph G.
@@ -331,10 +529,19 @@ def draw_networkx_nodes(
     cmap : Matplotlib colormap
        Colormap for mapping intensities of nodes (default=None)
 
+    frame : GraphFrame, optional
+       Node and edge tables already built from G and pos. Shared between
+       layers by ``draw_networkx`` (default=None, built from G and pos
+       with only the attributes that this layer's arguments refer to).
+
     Returns
     -------
     viz: ``altair.Chart`` object
     """
+    ###### node list argument
+    if nodelist is not None and not isinstance(nodelist, list):
+        raise Exception("nodelist must be a list or None.")
+
     if layer is not None:
         node_chart = layer
 
@@ -343,12 +550,24 @@ def draw_networkx_nodes(
         df_nodes = chart.layer[1].data
         node_chart = chart.layer[1]
 
+        if nodelist is not None:
+            # Subset dataframe.
+            df_nodes = df_nodes.loc[nodelist]
+            node_chart = node_chart.properties(data=df_nodes)
+
     else:
-        # Pandas dataframe of edges
-        df_nodes = to_pandas_nodes(G, pos)
+        # Pandas dataframe of the requested nodes only
+        if frame is None:
+            frame = GraphFrame(
+                G, pos,
+                nodelist=nodelist,
+                node_attributes=_encoded_fields(
+                    node_size, node_color, alpha, tooltip)
+            )
+        df_nodes = frame.nodes
 
         # Build a chart
-        node_chart = alt.Chart(df_nodes)
+        node_chart = alt.Chart(frame.data(df_nodes, 'nodes'))
 
 
     marker_attrs = {}
@@ -356,18 +575,9 @@ def draw_networkx_nodes(
 
     # ---------- Handle arguments ------------
 
-    ###### node list argument
-    if isinstance(nodelist, list):
-        # Subset dataframe.
-        df_nodes = df_nodes.loc[nodelist]
-
-    elif nodelist is not None:
-        raise Exception("nodelist must be a list or None.")
-
-
     ###### Node size
     if isinstance(node_size, str):
-        encoded_attrs["size"] = alt.Size(node_size, legend=None)
+        encoded_attrs["size"] = alt.Size(_typed(df_nodes, node_size), legend=None)
 
     elif isinstance(node_size, int):
         marker_attrs["size"] = node_size
@@ -380,14 +590,14 @@ def draw_networkx_nodes(
        raise Exception("node_color must be a string.")
 
     if node_color in df_nodes.columns:
-        encoded_attrs["fill"] = node_color
+        encoded_attrs["fill"] = _typed(df_nodes, node_color)
 
     else:
         marker_attrs["fill"] = node_color
 
     ##### alpha
     if isinstance(alpha, str):
-        encoded_attrs["opacity"] = alpha
+        encoded_attrs["opacity"] = _typed(df_nodes, alpha)
 
     elif isinstance(alpha, int) or isinstance(alpha, float):
         marker_attrs["opacity"] = alpha
@@ -398,14 +608,14 @@ def draw_networkx_nodes(
     ##### cmap
     if isinstance(cmap, str):
         encoded_attrs["fill"] = alt.Color(
-            node_color,
+            _typed(df_nodes, node_color),
             scale=alt.Scale(scheme=cmap))
 
     elif cmap is not None:
         raise Exception("cmap must be a string (colormap name) or None.")
 
     if tooltip is not None:
-        encoded_attrs['tooltip'] = tooltip
+        encoded_attrs['tooltip'] = _typed(df_nodes, tooltip)
 
     marker_attrs['strokeWidth'] = linewidths
     # ---------- Construct visualization ------------
@@ -413,8 +623,8 @@ def draw_networkx_nodes(
     node_chart = node_chart.mark_point(
         **marker_attrs
     ).encode(
-        x=alt.X('x', axis=alt.Axis(grid=False, labels=False, ticks=False)),
-        y=alt.Y('y', axis=alt.Axis(grid=False, labels=False, ticks=False)),
+        x=alt.X('x:Q', axis=alt.Axis(grid=False, labels=False, ticks=False)),
+        y=alt.Y('y:Q', axis=alt.Axis(grid=False, labels=False, ticks=False)),
         **encoded_attrs
     )
 
@@ -432,6 +642,7 @@ def draw_networkx_labels(
     font_size=15,
     font_color='black',
     node_label='label',
+    frame=None,
     **kwargs
     ):
     """Draw the nodes of the graph G.
@@ -464,10 +675,19 @@ def draw_networkx_labels(
     node_label : string
        The name of the node attribute to treat as a label.
 
+    frame : GraphFrame, optional
+       Node and edge tables already built from G and pos. Shared between
+       layers by ``draw_networkx`` (default=None, built from G and pos
+       with only the attributes that this layer's arguments refer to).
+
     Returns
     -------
     viz: ``altair.Chart`` object
     """
+    ###### node list argument
+    if nodelist is not None and not isinstance(nodelist, list):
+        raise Exception("nodelist must be a list or None.")
+
     if layer is not None:
         node_chart = layer
 
@@ -476,12 +696,24 @@ def draw_networkx_labels(
         df_nodes = chart.layer[1].data
         node_chart = chart.layer[1]
 
+        if nodelist is not None:
+            # Subset dataframe.
+            df_nodes = df_nodes.loc[nodelist]
+            node_chart = node_chart.properties(data=df_nodes)
+
     else:
-        # Pandas dataframe of edges
-        df_nodes = to_pandas_nodes(G, pos)
+        # Pandas dataframe of the requested nodes only
+        if frame is None:
+            frame = GraphFrame(
+                G, pos,
+                nodelist=nodelist,
+                node_attributes=_encoded_fields(
+                    font_size, font_color, node_label)
+            )
+        df_nodes = frame.nodes
 
         # Build a chart
-        node_chart = alt.Chart(df_nodes)
+        node_chart = alt.Chart(frame.data(df_nodes, 'nodes'))
 
 
     marker_attrs = {}
@@ -489,18 +721,9 @@ def draw_networkx_labels(
 
     # ---------- Handle arguments ------------
 
-    ###### node list argument
-    if isinstance(nodelist, list):
-        # Subset dataframe.
-        df_nodes = df_nodes.loc[nodelist]
-
-    elif nodelist is not None:
-        raise Exception("nodelist must be a list or None.")
-
-
     ###### Node size
     if isinstance(font_size, str):
-        encoded_attrs["size"] = alt.Size(font_size, legend=None)
+        encoded_attrs["size"] = alt.Size(_typed(df_nodes, font_size), legend=None)
 
     elif isinstance(font_size, int):
         marker_attrs["size"] = font_size
@@ -513,7 +736,7 @@ def draw_networkx_labels(
        raise Exception("node_color must be a string.")
 
     if font_color in df_nodes.columns:
-        encoded_attrs["fill"] = font_color
+        encoded_attrs["fill"] = _typed(df_nodes, font_color)
 
     else:
         marker_attrs["fill"] = font_color
@@ -525,9 +748,9 @@ def draw_networkx_labels(
         baseline='middle',
         **marker_attrs
     ).encode(
-        x=alt.X('x', axis=alt.Axis(grid=False, labels=False, ticks=False)),
-        y=alt.Y('y', axis=alt.Axis(grid=False, labels=False, ticks=False)),
-        text=node_label,
+        x=alt.X('x:Q', axis=alt.Axis(grid=False, labels=False, ticks=False)),
+        y=alt.Y('y:Q', axis=alt.Axis(grid=False, labels=False, ticks=False)),
+        text=_typed(df_nodes, node_label),
         **encoded_attrs
     )
 
@@ -536,6 +759,242 @@ def draw_networkx_labels(
 
     return node_chart
 
+def draw_networkx_density(
+    G=None,
+    pos=None,
+    elements='nodes',
+    bins=64,
+    cmap='greys',
+    alpha=1.0,
+    frame=None,
+    **kwargs):
+    """Draw the nodes or edges of the graph G as a density heatmap.
+
+    Node positions, or the straight edge segments, are counted on a
+    ``bins`` x ``bins`` grid with NumPy and drawn as one ``mark_rect`` per
+    non-empty cell, so the size of the chart does not grow with the size
+    of the graph.
+
+    Parameters
+    ----------
+    G : graph
+       A networkx graph
+
+    pos : dictionary
+       A dictionary with nodes as keys and positions as values.
+       Positions should be sequences of length 2.
+
+    elements : 'nodes' or 'edges', optional (default='nodes')
+       Count node positions or the cells crossed by each edge.
+
+    bins : int, optional (default=64)
+       Number of cells along each axis.
+
+    cmap : string, optional (default='greys')
+       Vega color scheme for the counts, drawn on a log scale.
+
+    alpha : float, optional (default=1.0)
+       The heatmap transparency.
+
+    frame : GraphFrame, optional
+       Node and edge tables already built from G and pos (default=None,
+       built from G and pos without attributes).
+
+    Returns
+    -------
+    viz: ``altair.Chart`` object
+    """
+    if not isinstance(cmap, str):
+        raise Exception("cmap must be a string (colormap name).")
+
+    if frame is None:
+        frame = GraphFrame(
+            G, pos,
+            node_attributes=(),
+            edge_attributes=()
+        )
+    df_density = frame.density(elements, bins)
+
+    return alt.Chart(frame.data(df_density, elements + '-density')).mark_rect(
+        opacity=alpha
+    ).encode(
+        x=alt.X('x:Q', axis=alt.Axis(title='', grid=False, labels=False, ticks=False)),
+        y=alt.Y('y:Q', axis=alt.Axis(title='', grid=False, labels=False, ticks=False)),
+        x2='x2:Q',
+        y2='y2:Q',
+        color=alt.Color(
+            'count:Q',
+            scale=alt.Scale(scheme=cmap, type='log'),
+            legend=None),
+    )
+
+
+def draw_networkx_bundles(
+    G=None,
+    pos=None,
+    edgelist=None,
+    communities=None,
+    max_points=None,
+    edge_color='black',
+    alpha=1.0,
+    seed=None,
+    frame=None,
+    **kwargs):
+    """Draw the edges of the graph G bundled by community.
+
+    Edges between communities are merged into weighted spokes and trunks
+    through the community centroids, see ``bundling.bundle_edges``; the
+    stroke width of each mark grows with the number of edges it carries.
+
+    Parameters
+    ----------
+    G : graph
+       A networkx graph
+
+    pos : dictionary
+       A dictionary with nodes as keys and positions as values.
+       Positions should be sequences of length 2.
+
+    edgelist : collection of edge tuples
+       Draw only specified edges(default=G.edges())
+
+    communities : dict or list of sets, optional
+       Community of each node, see ``bundling.community_labels``
+       (default=None, detected from G).
+
+    max_points : int, optional (default=None)
+       Upper bound on the number of points written to the chart.
+
+    edge_color : color string, optional (default='black')
+       Edge color.
+
+    alpha : float, optional (default=1.0)
+       The edge transparency.
+
+    seed : int, optional (default=None)
+       Seed for community detection.
+
+    frame : GraphFrame, optional
+       Node and edge tables already built from G and pos (default=None,
+       built from G and pos without attributes).
+
+    Returns
+    -------
+    viz: ``altair.Chart`` object
+    """
+    ###### edge list argument
+    if edgelist is not None and not isinstance(edgelist, list):
+        raise Exception("edgelist must be a list or None.")
+
+    if not isinstance(edge_color, str):
+        raise Exception("edge_color must be a string.")
+
+    if frame is None:
+        frame = GraphFrame(
+            G, pos,
+            edgelist=edgelist,
+            node_attributes=(),
+            edge_attributes=()
+        )
+    labels = community_labels(frame.G, communities, seed=seed)
+    df_bundles = bundle_edges(
+        frame.segments, frame.pos, labels, max_points=max_points, G=frame.G)
+
+    return alt.Chart(frame.data(df_bundles, 'bundles')).mark_line(
+        color=edge_color,
+        opacity=alpha
+    ).encode(
+        x=alt.X('x:Q', axis=alt.Axis(title='', grid=False, labels=False, ticks=False)),
+        y=alt.Y('y:Q', axis=alt.Axis(title='', grid=False, labels=False, ticks=False)),
+        detail='edge:N',
+        size=alt.Size('weight:Q', scale=alt.Scale(range=[0.5, 8]), legend=None),
+    )
+
+
+def draw_networkx_matrix(
+    G=None,
+    order='degree',
+    weight='weight',
+    max_cells=None,
+    cmap='greys',
+    alpha=1.0,
+    communities=None,
+    seed=None,
+    data_sink=None,
+    **kwargs):
+    """Draw the graph G as an adjacency matrix.
+
+    Every non-empty cell of the matrix is one ``mark_rect``, colored by
+    the weight of its edges, see ``matrix.to_pandas_adjacency``. This
+    reads better than node-link charts for dense graphs, and with
+    ``max_cells`` the chart size is bounded whatever the number of edges.
+
+    Parameters
+    ----------
+    G : graph
+       A networkx graph
+
+    order : string or list, optional (default='degree')
+       Order of the rows and columns, see ``matrix.node_order``.
+
+    weight : string, optional (default='weight')
+       Edge attribute summed per cell.
+
+    max_cells : int, optional (default=None)
+       Merge rows and columns into blocks to draw at most this many cells.
+
+    cmap : string, optional (default='greys')
+       Vega color scheme for the weights.
+
+    alpha : float, optional (default=1.0)
+       The cell transparency.
+
+    communities : dict or list of sets, optional
+       Communities for order='community' (default=None, detected from G).
+
+    seed : int, optional (default=None)
+       Seed for community detection.
+
+    data_sink : callable, optional
+       Turns the cell table into chart data, such as a
+       ``data.DataExporter`` (default=None, inlined in the chart).
+
+    Returns
+    -------
+    viz: ``altair.Chart`` object
+    """
+    if not isinstance(cmap, str):
+        raise Exception("cmap must be a string (colormap name).")
+
+    G = as_graph(G)
+    nodes = node_order(
+        G, order, weight=weight, communities=communities, seed=seed)
+    df_cells = to_pandas_adjacency(G, nodes, weight=weight, max_cells=max_cells)
+
+    if 'source' in df_cells.columns:
+        tooltip = ['source:N', 'target:N', 'weight:Q']
+    else:
+        tooltip = ['y:Q', 'y2:Q', 'x:Q', 'x2:Q', 'count:Q', 'weight:Q']
+
+    data = df_cells if data_sink is None else data_sink(df_cells, 'matrix')
+    scale = dict(domain=[0, len(nodes)], nice=False, zero=False)
+    axis = alt.Axis(title='', grid=False, labels=False, ticks=False)
+
+    return alt.Chart(data).mark_rect(
+        opacity=alpha
+    ).encode(
+        x=alt.X('x:Q', scale=alt.Scale(**scale), axis=axis),
+        y=alt.Y('y:Q', scale=alt.Scale(reverse=True, **scale), axis=axis),
+        x2='x2:Q',
+        y2='y2:Q',
+        color=alt.Color(
+            'weight:Q',
+            scale=alt.Scale(scheme=cmap),
+            legend=None),
+        tooltip=tooltip,
+    )
+
+
 def draw_networkx(
     G=None,
     pos=None,
@@ -557,9 +1016,35 @@ def draw_networkx(
     arrow_color='black',
     node_tooltip=None,
     edge_tooltip=None,
-    edge_cmap=None):
+    edge_cmap=None,
+    edge_format='lines',
+    compact=False,
+    layout='spring',
+    layout_kwargs=None,
+    layout_cache=None,
+    data_sink=None,
+    max_elements=None,
+    density_bins=64,
+    viewport=None,
+    spatial_index=None,
+    sparsify=None,
+    sparsify_kwargs=None,
+    edge_bundling=None,
+    bundling_kwargs=None):
     """Draw the graph G using Altair.
 
+    G : graph, DataFrame, array or sparse matrix
+       A networkx graph, or an edge list or adjacency matrix that is
+       wrapped with ``arraygraph.as_graph`` and drawn without building a
+       networkx graph.
+
+    pos : dictionary, DataFrame, array or tuple, optional
+       A dictionary with nodes as keys and positions as values, or any
+       array form accepted by ``arraygraph.as_positions``: a DataFrame
+       with x/y columns indexed by node, an ``(xy, nodes)`` tuple, or an
+       (N, 2) array with one row per node in the order of G
+       (default=None, computed with ``layout``).
+
     nodelist : list, optional (default G.nodes())
        Draw only specified nodes
 
@@ -620,12 +1105,145 @@ def draw_networkx(
 
     edge_cmap : Matplotlib colormap, optional (default=None)
        Colormap for mapping intensities of edges
+
+    edge_format : 'lines', 'rules' or 'lookup', optional (default='lines')
+       Draw edges and arrows from two rows per edge with ``mark_line``
+       ('lines'), from one row per edge with ``mark_rule`` ('rules'), or
+       from one row of source/target ids per edge whose positions are
+       looked up in the node table by the browser ('lookup').
+
+    compact : bool, optional (default=False)
+       Build the node and edge tables with compact dtypes: no tuple-valued
+       pair column, categorical source/target ids, float32 positions and
+       downcast numeric attributes.
+
+    layout : string or callable, optional (default='spring')
+       Layout used to position the nodes when ``pos`` is not given. Either
+       the name of a layout in ``layout.LAYOUTS``, such as 'spring' or the
+       vectorized 'force' layout for large graphs, or a function that takes
+       G and returns a dictionary of positions.
+
+    layout_kwargs : dict, optional (default=None)
+       Keyword arguments passed on to the layout function.
+
+    layout_cache : LayoutCache, optional (default=None)
+       Cache of layouts keyed by the structure of G. When given, the layout
+       is only computed if this graph and these layout arguments have not
+       been laid out before. Callable layouts are keyed by name, so
+       lambdas, closures and partials can't be cached here; lay them out
+       with ``layout_cache.layout(G, layout, name=...)`` and pass pos.
+
+    data_sink : callable, optional (default=None)
+       Turns each node or edge table into chart data. Pass a
+       ``data.DataExporter`` to write the tables to sidecar files that the
+       chart loads by URL instead of embedding them inline, or a
+       ``data.InlineEncoder`` to embed them as compact CSV strings.
+
+    max_elements : int, optional (default=None)
+       Element budget per layer. When more nodes (or edges) than this
+       are drawn, they are replaced by a density heatmap, see
+       ``draw_networkx_density``; node labels and arrows are then left
+       out. By default every element is always drawn.
+
+    density_bins : int, optional (default=64)
+       Number of heatmap cells along each axis.
+
+    viewport : tuple, optional (default=None)
+       (xmin, xmax, ymin, ymax) of a region to draw. Only nodes inside it
+       and edges whose segments cross it are written to the chart, whose
+       scales are fixed to the region with marks clipped to it.
+
+    spatial_index : spatial.SpatialIndex, optional (default=None)
+       Index over G and pos for viewport queries. Pass one to reuse it
+       across several views of the same layout.
+
+    sparsify : 'top_k', 'threshold' or 'backbone', optional (default=None)
+       Draw only the important edges of a dense weighted graph, selected by
+       ``sparsify.sparsify_edges``. The number of edges left out is
+       reported in the chart's ``usermeta`` as 'dropped_edges'.
+
+    sparsify_kwargs : dict, optional (default=None)
+       Keyword arguments for ``sparsify.sparsify_edges``, such as
+       ``weight``, ``k``, ``threshold`` or ``alpha``.
+
+    edge_bundling : 'community', optional (default=None)
+       Bundle the edges between communities into weighted marks, see
+       ``draw_networkx_bundles``. Arrows are then left out.
+
+    bundling_kwargs : dict, optional (default=None)
+       Keyword arguments for ``draw_networkx_bundles``, such as
+       ``communities``, ``max_points`` or ``seed``.
     """
-    if not pos:
-        pos = nx.drawing.layout.spring_layout(G)
+    G = as_graph(G)
+    if pos is None or len(pos) == 0:
+        if layout_cache is not None:
+            pos = layout_cache.layout(G, layout, **(layout_kwargs or {}))
+        else:
+            pos = compute_layout(G, layout, **(layout_kwargs or {}))
+
+    # Keep positions as one array that every layer gathers from.
+    pos = as_positions(pos, G)
+
+    # Keep only the important edges.
+    if sparsify is not None:
+        edgelist, dropped_edges = sparsify_edges(
+            G, sparsify, edgelist=edgelist, **(sparsify_kwargs or {}))
+
+    # Keep only what the viewport shows.
+    if viewport is not None:
+        nodelist, edgelist = cull(
+            G, pos, viewport,
+            nodelist=nodelist,
+            edgelist=edgelist,
+            index=spatial_index
+        )
+
+    # Build node and edge tables once and share them between layers,
+    # holding only the attributes that the encodings refer to.
+    frame = GraphFrame(
+        G, pos,
+        nodelist=nodelist,
+        edgelist=edgelist,
+        node_key='node' if edge_format == 'lookup' else None,
+        compact=compact,
+        node_attributes=_encoded_fields(
+            node_size, node_color, alpha, node_tooltip,
+            node_label, font_size, font_color),
+        edge_attributes=_encoded_fields(
+            width, arrow_width, edge_color, arrow_color, alpha, edge_tooltip),
+        data_sink=data_sink,
+        extent=viewport
+    )
+
+    # Level of detail: aggregate layers that exceed the element budget.
+    n_nodes = G.number_of_nodes() if nodelist is None else len(nodelist)
+    n_edges = G.number_of_edges() if edgelist is None else len(edgelist)
+    node_density = max_elements is not None and n_nodes > max_elements
+    edge_density = max_elements is not None and n_edges > max_elements
+
+    if edge_bundling not in (None, 'community'):
+        raise Exception("edge_bundling must be 'community' or None.")
 
     # Draw edges
-    if len(G.edges())>0:
+    if G.number_of_edges()>0 and edge_bundling is not None and not edge_density:
+        # Bundled marks merge edges, so attributes can't be encoded.
+        edges = draw_networkx_bundles(
+            edge_color=edge_color if edge_color not in frame.segments.columns else 'black',
+            alpha=alpha if not isinstance(alpha, str) else 1.0,
+            frame=frame,
+            **(bundling_kwargs or {})
+        )
+
+    elif G.number_of_edges()>0 and edge_density:
+        edges = draw_networkx_density(
+            elements='edges',
+            bins=density_bins,
+            cmap=edge_cmap or 'greys',
+            alpha=alpha if not isinstance(alpha, str) else 1.0,
+            frame=frame,
+        )
+
+    elif G.number_of_edges()>0:
         edges = draw_networkx_edges(
             G,
             pos,
@@ -635,9 +1253,11 @@ def draw_networkx(
             edge_color=edge_color,
             edge_cmap=edge_cmap,
             tooltip=edge_tooltip,
+            edge_format=edge_format,
+            frame=frame,
             )
 
-        if isinstance(G, nx.DiGraph):
+        if G.is_directed():
             # Draw edges
             arrows = draw_networkx_arrows(
                 G,
@@ -649,10 +1269,21 @@ def draw_networkx(
                 edge_color=arrow_color,
                 edge_cmap=edge_cmap,
                 tooltip=edge_tooltip,
+                edge_format=edge_format,
+                frame=frame,
                 )
 
     # Draw nodes
-    if len(G.nodes())>0:
+    if G.number_of_nodes()>0 and node_density:
+        nodes = draw_networkx_density(
+            elements='nodes',
+            bins=density_bins,
+            cmap=cmap or 'blues',
+            alpha=alpha if not isinstance(alpha, str) else 1.0,
+            frame=frame,
+        )
+
+    elif G.number_of_nodes()>0:
         nodes = draw_networkx_nodes(
             G,
             pos,
@@ -663,6 +1294,7 @@ def draw_networkx(
             linewidths=linewidths,
             cmap=cmap,
             tooltip=node_tooltip,
+            frame=frame,
         )
 
         # Draw node labels:
@@ -673,24 +1305,32 @@ def draw_networkx(
                 nodelist=nodelist,
                 font_size=font_size,
                 font_color=font_color,
-                node_label=node_label
+                node_label=node_label,
+                frame=frame,
             )
 
 
     # Layer the chart
     viz = []
-    if len(G.edges()):
+    if G.number_of_edges():
         viz.append(edges)
-        if isinstance(G, nx.DiGraph):
+        if G.is_directed() and not (edge_density or edge_bundling):
             viz.append(arrows)
 
-    if len(G.nodes()):
+    if G.number_of_nodes():
         viz.append(nodes)
-        if node_label:
+        if node_label and not node_density:
             viz.append(labels)
 
     if viz:
         viz = alt.layer(*viz)
+        if viewport is not None:
+            viz = _zoom(viz, viewport)
+        if node_density or edge_density:
+            # Heatmaps keep their own color scales.
+            viz = viz.resolve_scale(color='independent')
+        if sparsify is not None:
+            viz = viz.properties(usermeta={'dropped_edges': dropped_edges})
     else:
         raise ValueError("G does not contain any nodes or edges.")
 
@@ -0,0 +1,666 @@
+import os
+import pickle
+import hashlib
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+from .core import _edge_index
+from .arraygraph import ArrayGraph, Positions, as_positions
+
+
+def _csr_adjacency(G, nodes, weight='weight'):
+    """Symmetric adjacency of G as CSR arrays.
+
+    Returns ``(indptr, indices, data)`` for the rows/columns given by
+    ``nodes``. Self-loops are dropped and edges without a ``weight``
+    attribute count as 1.
+    """
+    rows, cols, data = _edge_index(G, nodes, weight=weight)
+
+    keep = rows != cols
+    rows, cols, data = rows[keep], cols[keep], data[keep]
+
+    # Store both directions so every node sees all of its neighbours.
+    rows, cols = np.concatenate([rows, cols]), np.concatenate([cols, rows])
+    data = np.concatenate([data, data])
+
+    order = np.argsort(rows, kind='stable')
+    counts = np.bincount(rows, minlength=len(nodes))
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+    return indptr, cols[order], data[order]
+
+
+def _attraction(xy, indptr, indices, data, k):
+    """Fruchterman-Reingold attraction along the CSR adjacency."""
+    rows = np.repeat(np.arange(len(xy)), np.diff(indptr))
+    delta = xy[indices] - xy[rows]
+    distance = np.sqrt((delta ** 2).sum(axis=1))
+    force = delta * (data * distance / k)[:, None]
+
+    out = np.empty_like(xy)
+    out[:, 0] = np.bincount(rows, weights=force[:, 0], minlength=len(xy))
+    out[:, 1] = np.bincount(rows, weights=force[:, 1], minlength=len(xy))
+    return out
+
+
+def _quadtree(xy, depth=16):
+    """Build a quadtree over the (N, 2) positions ``xy``.
+
+    Nodes are sorted by their Morton code at the finest level. Returns the
+    codes, the corner and width of the root cell and, for every level from
+    the root down, the sorted keys of the occupied cells with each cell's
+    node count and sum of positions.
+    """
+    lo = xy.min(axis=0)
+    extent = max((xy.max(axis=0) - lo).max(), 1e-12) * (1 + 1e-9)
+    ij = ((xy - lo) / extent * (1 << depth)).astype(np.int64)
+
+    # Interleave the bits of the cell coordinates into Morton codes.
+    code = np.zeros(len(xy), dtype=np.int64)
+    for bit in range(depth):
+        code |= ((ij[:, 0] >> bit) & 1) << (2 * bit + 1)
+        code |= ((ij[:, 1] >> bit) & 1) << (2 * bit)
+
+    order = np.argsort(code, kind='stable')
+    sorted_code, sorted_xy = code[order], xy[order]
+
+    levels = []
+    for level in range(depth + 1):
+        prefix = sorted_code >> (2 * (depth - level))
+        starts = np.flatnonzero(np.r_[True, prefix[1:] != prefix[:-1]])
+        levels.append((
+            prefix[starts],
+            np.diff(np.r_[starts, len(prefix)]),
+            np.add.reduceat(sorted_xy, starts, axis=0),
+        ))
+    return code, lo, extent, levels
+
+
+def _repulsion(xy, k, theta=0.8, depth=16, targets=None):
+    """Fruchterman-Reingold repulsion with the Barnes-Hut approximation.
+
+    A quadtree cell that is far from a node, compared to its width (by the
+    opening angle ``theta``), acts as one particle at its centroid carrying
+    the cell's node count. When ``targets`` is given only those node
+    indices walk the tree and the result has one row per target.
+    """
+    tree = _quadtree(xy, depth)
+    node = np.arange(len(xy)) if targets is None else np.asarray(targets)
+    return _tree_repulsion(
+        tree, xy[node, 0], xy[node, 1], k, theta, own=tree[0][node])
+
+
+def _tree_repulsion(tree, px, py, k, theta=0.8, own=None):
+    """Repulsion on the points (px, py) from the nodes of a quadtree.
+
+    All points walk the tree together, level by level, as arrays of
+    (point, cell) pairs. ``own`` holds the Morton codes of points that are
+    nodes of the tree themselves, whose own pull is left out; points that
+    are not in the tree feel every node in it.
+    """
+    code, lo, extent, levels = tree
+    depth = len(levels) - 1
+    fx, fy = np.zeros(len(px)), np.zeros(len(px))
+    k2 = k * k
+    theta2 = theta * theta
+
+    node = np.arange(len(px))
+    cell = np.zeros(len(node), dtype=np.intp)
+    for level, (keys, counts, sums) in enumerate(levels):
+        mass = counts[cell].astype(float)
+        if own is None:
+            contains = np.zeros(len(node), dtype=bool)
+        else:
+            contains = (own[node] >> (2 * (depth - level))) == keys[cell]
+
+        if level == depth:
+            # Leaves with several (coincident) nodes: leave the node out.
+            mass -= contains
+            keep = mass > 0
+            node, cell, mass = node[keep], cell[keep], mass[keep]
+            inside = contains[keep]
+            cx = (sums[cell, 0] - inside * px[node]) / mass
+            cy = (sums[cell, 1] - inside * py[node]) / mass
+        else:
+            cx = sums[cell, 0] / mass
+            cy = sums[cell, 1] / mass
+
+        dx = px[node] - cx
+        dy = py[node] - cy
+        distance2 = dx * dx + dy * dy
+
+        if level == depth:
+            accept = np.ones(len(node), dtype=bool)
+        else:
+            width = extent / (1 << level)
+            accept = ~contains & ((mass == 1) | (width * width < theta2 * distance2))
+
+        # Add the pull of accepted cells.
+        weights = np.where(accept, k2 * mass / np.maximum(distance2, 1e-9), 0)
+        fx += np.bincount(node, weights=weights * dx, minlength=len(px))
+        fy += np.bincount(node, weights=weights * dy, minlength=len(px))
+
+        if level == depth:
+            break
+
+        # Open the remaining cells, except a node's own single-node cell.
+        expand = ~accept & ~(contains & (mass == 1))
+        node, cell = node[expand], cell[expand]
+        child_keys = levels[level + 1][0]
+        first = np.searchsorted(child_keys, keys[cell] << 2)
+        last = np.searchsorted(child_keys, (keys[cell] << 2) + 4)
+        nchildren = last - first
+        node = np.repeat(node, nchildren)
+        offsets = np.arange(nchildren.sum()) - np.repeat(np.cumsum(nchildren) - nchildren, nchildren)
+        cell = np.repeat(first, nchildren) + offsets
+
+    return np.column_stack([fx, fy])
+
+
+def force_directed_layout(
+    G,
+    iterations=50,
+    tol=1e-4,
+    k=None,
+    theta=0.8,
+    weight='weight',
+    scale=1,
+    center=None,
+    seed=None):
+    """Position nodes with a vectorized Fruchterman-Reingold force layout.
+
+    Meant for large graphs, where ``networkx.spring_layout`` dominates the
+    time of ``draw_networkx``. Attraction is summed over a CSR adjacency and
+    repulsion uses the Barnes-Hut approximation, so one iteration costs about
+    O(E + N log N) NumPy work instead of O(N^2).
+
+    Parameters
+    ----------
+    G : graph
+       A networkx graph
+
+    iterations : int, optional (default=50)
+       Maximum number of iterations.
+
+    tol : float, optional (default=1e-4)
+       Stop once the mean node displacement of an iteration falls below
+       this value.
+
+    k : float, optional (default=None)
+       Optimal distance between nodes. Defaults to 1/sqrt(N).
+
+    theta : float, optional (default=0.8)
+       Barnes-Hut opening angle. Smaller values are more accurate and
+       slower; 0 computes exact repulsion.
+
+    weight : string, optional (default='weight')
+       Edge attribute holding the attraction weight. Missing weights are 1.
+
+    scale : float, optional (default=1)
+       Scale factor for positions, as in ``networkx.rescale_layout``.
+
+    center : array-like, optional (default=None)
+       Coordinate pair around which to center the layout.
+
+    seed : int, optional (default=None)
+       Seed for the random initial positions.
+
+    Returns
+    -------
+    pos : Positions
+       A read-only mapping of positions keyed by node, backed by one
+       (N, 2) array, see ``arraygraph.Positions``.
+    """
+    nodes = list(G)
+    size = len(nodes)
+    center = np.zeros(2) if center is None else np.asarray(center, dtype=float)
+
+    if size == 0:
+        return Positions(np.empty((0, 2)), nodes)
+    if size == 1:
+        return Positions(center[None], nodes)
+
+    if k is None:
+        k = np.sqrt(1.0 / size)
+
+    indptr, indices, data = _csr_adjacency(G, nodes, weight=weight)
+    xy = np.random.RandomState(seed).rand(size, 2)
+
+    # Cool the maximum step linearly, as networkx does.
+    temperature = 0.1 * max(np.ptp(xy[:, 0]), np.ptp(xy[:, 1]))
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        displacement = _repulsion(xy, k, theta) + _attraction(xy, indptr, indices, data, k)
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 0.01)
+        step = displacement * (temperature / length)[:, None]
+        xy += step
+
+        temperature -= cooling
+        if np.sqrt((step ** 2).sum(axis=1)).mean() < tol:
+            break
+
+    xy = nx.rescale_layout(xy, scale=scale) + center
+    return Positions(xy, nodes)
+
+
+def _place_new_nodes(G, pos, new_nodes, k, rng, lo, hi):
+    """Place new nodes at the mean position of their placed neighbours.
+
+    Nodes are placed in breadth-first order from the existing layout, so
+    chains of new nodes grow outward from where they attach. Nodes with no
+    path to a placed node are dropped at random inside ``lo``-``hi``.
+    Returns the positions of the new nodes only.
+    """
+    new = set(new_nodes)
+    placed = {}
+
+    def known(m):
+        return m in placed or (m not in new and m in pos)
+
+    def position(m):
+        return placed[m] if m in placed else pos[m]
+
+    pending = set(new)
+    while pending:
+        frontier = [
+            n for n in pending
+            if any(known(m) for m in nx.all_neighbors(G, n))
+        ]
+        if not frontier:
+            n = pending.pop()
+            placed[n] = lo + rng.rand(2) * (hi - lo)
+            continue
+
+        step = {}
+        for n in frontier:
+            neighbours = [position(m) for m in nx.all_neighbors(G, n) if known(m)]
+            jitter = (rng.rand(2) - 0.5) * k
+            step[n] = np.mean(neighbours, axis=0) + jitter
+        placed.update(step)
+        pending.difference_update(step)
+    return placed
+
+
+def incremental_layout(
+    G,
+    pos,
+    added_nodes=None,
+    added_edges=None,
+    removed_edges=None,
+    hops=1,
+    iterations=10,
+    k=None,
+    theta=0.8,
+    weight='weight',
+    seed=None):
+    """Update a previous layout of an evolving graph.
+
+    New nodes are placed next to their neighbours and a few force-directed
+    iterations then move only the nodes near the change: new nodes, the
+    endpoints of added or removed edges and their neighbours within
+    ``hops``. Every other node keeps its previous position, so the
+    quadtree over those fixed nodes is built once and the iterations only
+    touch the moving nodes and their edges. Apart from that one vectorized
+    pass over the positions, to look them up, copy them and build the
+    tree, the cost follows the size of the change rather than the size
+    of G.
+
+    Parameters
+    ----------
+    G : graph
+       The current networkx graph.
+
+    pos : dictionary or Positions
+       Positions from the previous layout, keyed by node. Nodes that are no
+       longer in G are dropped.
+
+    added_nodes : collection, optional (default=None)
+       Nodes added since ``pos`` was computed. Defaults to the nodes of G
+       missing from ``pos``.
+
+    added_edges, removed_edges : collection of edge tuples, optional
+       Edges added or removed since ``pos`` was computed (default=None).
+
+    hops : int, optional (default=1)
+       How far from a changed node the refinement reaches.
+
+    iterations : int, optional (default=10)
+       Number of refinement iterations.
+
+    k : float, optional (default=None)
+       Optimal distance between nodes. Defaults to the layout's extent
+       divided by sqrt(N).
+
+    theta : float, optional (default=0.8)
+       Barnes-Hut opening angle, see ``force_directed_layout``.
+
+    weight : string, optional (default='weight')
+       Edge attribute holding the attraction weight. Missing weights are 1.
+
+    seed : int, optional (default=None)
+       Seed for the placement jitter of new nodes.
+
+    Returns
+    -------
+    pos : dict or Positions
+       Positions keyed by node, in the form ``pos`` was given in.
+    """
+    rng = np.random.RandomState(seed)
+    positions = as_positions(pos)
+    nodes = pd.Index(list(G), tupleize_cols=False)
+    rows = positions.node_index.get_indexer(nodes)
+    if added_nodes is None:
+        added_nodes = list(nodes[rows < 0])
+    added_nodes = list(added_nodes)
+
+    # Rows of pos holding the previous positions of nodes still in G.
+    previous = np.zeros(len(positions), dtype=bool)
+    previous[rows[rows >= 0]] = True
+    added_rows = positions.node_index.get_indexer(
+        pd.Index(added_nodes, tupleize_cols=False))
+    previous[added_rows[added_rows >= 0]] = False
+
+    xy = positions.xy[previous]
+    if len(xy):
+        lo, hi = xy.min(axis=0), xy.max(axis=0)
+    else:
+        lo, hi = np.zeros(2), np.ones(2)
+    if k is None:
+        extent = max((hi - lo).max(), 1e-12) if len(xy) else 1.0
+        k = extent * np.sqrt(1.0 / max(len(G), 1))
+
+    moved = _place_new_nodes(G, positions, added_nodes, k, rng, lo, hi)
+
+    # Nodes allowed to move: the changed nodes and their neighbourhood.
+    changed = set(added_nodes)
+    for edges in (added_edges or [], removed_edges or []):
+        for e in edges:
+            changed.update(n for n in e[:2] if n in G)
+    active = set(changed)
+    frontier = changed
+    for _ in range(hops):
+        frontier = {
+            m for n in frontier for m in nx.all_neighbors(G, n)
+        } - active
+        active |= frontier
+
+    if active and iterations >= 1:
+        moved.update(_refine(
+            G, positions, moved, list(active), previous, k, theta, weight,
+            iterations))
+
+    return _updated_positions(pos, positions, nodes, rows, moved)
+
+
+def _refine(G, positions, placed, active, previous, k, theta, weight,
+            iterations):
+    """Force-directed iterations that only move the ``active`` nodes.
+
+    Every other node of G is fixed at its row of ``positions``, so their
+    quadtree is built once; the active nodes repel each other through a
+    small tree of their own.
+    """
+    index = {n: i for i, n in enumerate(active)}
+    xy = np.array([placed[n] if n in placed else positions[n] for n in active],
+                  dtype=float).reshape(len(active), 2)
+
+    active_rows = positions.node_index.get_indexer(
+        pd.Index(active, tupleize_cols=False))
+    fixed = previous.copy()
+    fixed[active_rows[active_rows >= 0]] = False
+    tree = _quadtree(positions.xy[fixed]) if fixed.any() else None
+
+    # Edges incident to the moving nodes, as (active row, neighbour) pairs;
+    # fixed neighbours are numbered after the active nodes.
+    rows, cols, data = [], [], []
+    outside, outside_xy = {}, []
+    for row, n in enumerate(active):
+        for m in nx.all_neighbors(G, n):
+            if m == n:
+                continue
+            w = G.get_edge_data(n, m) or G.get_edge_data(m, n) or {}
+            if G.is_multigraph():
+                w = next(iter(w.values()), {})
+            col = index.get(m)
+            if col is None:
+                col = outside.get(m)
+                if col is None:
+                    col = outside[m] = len(active) + len(outside_xy)
+                    outside_xy.append(placed[m] if m in placed else positions[m])
+            rows.append(row)
+            cols.append(col)
+            data.append(w.get(weight, 1))
+    rows = np.array(rows, dtype=np.intp)
+    cols = np.array(cols, dtype=np.intp)
+    data = np.array(data, dtype=float)
+    outside_xy = np.array(outside_xy, dtype=float).reshape(-1, 2)
+
+    temperature = k
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        displacement = _repulsion(xy, k, theta)
+        if tree is not None:
+            displacement += _tree_repulsion(tree, xy[:, 0], xy[:, 1], k, theta)
+
+        delta = np.concatenate([xy, outside_xy])[cols] - xy[rows]
+        distance = np.sqrt((delta ** 2).sum(axis=1))
+        force = delta * (data * distance / k)[:, None]
+        displacement[:, 0] += np.bincount(rows, weights=force[:, 0], minlength=len(xy))
+        displacement[:, 1] += np.bincount(rows, weights=force[:, 1], minlength=len(xy))
+
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 1e-12)
+        xy += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+
+    return dict(zip(active, xy))
+
+
+def _updated_positions(pos, positions, nodes, rows, moved):
+    """``pos`` without the nodes that left G and with ``moved`` applied,
+    as a dictionary or Positions like ``pos``.
+    """
+    if isinstance(pos, Positions):
+        xy = np.empty((len(nodes), 2))
+        known = rows >= 0
+        xy[known] = positions.xy[rows[known]]
+        if moved:
+            at = nodes.get_indexer(pd.Index(list(moved), tupleize_cols=False))
+            xy[at] = np.array(list(moved.values()), dtype=float)
+        return Positions(xy, nodes)
+
+    out = dict(pos)
+    for n in positions.node_index[~positions.node_index.isin(nodes)]:
+        del out[n]
+    out.update(moved)
+    return out
+
+
+LAYOUTS = {
+    'spring': nx.spring_layout,
+    'force': force_directed_layout,
+    'kamada_kawai': nx.kamada_kawai_layout,
+    'circular': nx.circular_layout,
+    'random': nx.random_layout,
+    'shell': nx.shell_layout,
+    'spectral': nx.spectral_layout,
+}
+
+
+def compute_layout(G, layout='spring', **kwargs):
+    """Compute node positions for G.
+
+    Parameters
+    ----------
+    G : graph
+       A networkx graph
+
+    layout : string or callable, optional (default='spring')
+       Name of a layout in ``LAYOUTS`` ('spring', 'force', ...), or a
+       function that takes G and returns a dictionary of positions.
+
+    **kwargs :
+       Passed on to the layout function.
+
+    Returns
+    -------
+    pos : dict
+       A dictionary of positions keyed by node.
+    """
+    if callable(layout):
+        return layout(G, **kwargs)
+
+    elif layout in LAYOUTS:
+        if isinstance(G, ArrayGraph) and layout != 'force':
+            # networkx layouts need a networkx graph.
+            G = G.to_networkx()
+        return LAYOUTS[layout](G, **kwargs)
+
+    raise Exception("layout must be one of {} or a callable.".format(
+        ", ".join(sorted(LAYOUTS))))
+
+
+def _layout_name(layout, name=None):
+    """Stable name of a layout, for use in cache keys.
+
+    Functions are named by module and qualified name. Lambdas, closures
+    and partials have no name that tells them apart or survives a restart,
+    so they must be given one.
+    """
+    if not callable(layout):
+        return str(layout)
+
+    elif name is not None:
+        return str(name)
+
+    qualname = getattr(layout, '__qualname__', None)
+    if qualname is None or '<' in qualname:
+        raise Exception(
+            "Lambdas, closures and partials need a name= to be cached.")
+    return '{}.{}'.format(getattr(layout, '__module__', ''), qualname)
+
+
+def graph_fingerprint(G, **params):
+    """Structural fingerprint of G and a set of layout parameters.
+
+    Hashes the node set, the edge set (ignoring endpoint order in
+    undirected graphs) and ``params``. Attributes are not included, so
+    recoloring or reweighting a graph keeps its fingerprint unless the
+    weight is passed as a parameter. Node ids are hashed by ``repr``.
+
+    Returns
+    -------
+    fingerprint : string
+       A hex digest.
+    """
+    directed = G.is_directed()
+    nodes = sorted(repr(n) for n in G)
+
+    edges = []
+    for u, v in G.edges():
+        u, v = repr(u), repr(v)
+        if not directed and v < u:
+            u, v = v, u
+        edges.append(u + '\x00' + v)
+    edges.sort()
+
+    digest = hashlib.sha1()
+    digest.update(repr((directed, G.is_multigraph())).encode())
+    for item in nodes:
+        digest.update(item.encode() + b'\x01')
+    digest.update(b'\x02')
+    for item in edges:
+        digest.update(item.encode() + b'\x01')
+    digest.update(b'\x02')
+    digest.update(repr(sorted((k, repr(v)) for k, v in params.items())).encode())
+    return digest.hexdigest()
+
+
+class LayoutCache(object):
+    """Cache of node positions keyed by ``graph_fingerprint``.
+
+    Positions live in an in-memory LRU tier and, when ``directory`` is
+    given, in an on-disk tier that survives restarts. On disk every layout
+    is stored as an (N, 2) ``.npy`` array, loaded memory-mapped, next to a
+    pickled list of node ids in the same row order.
+
+    Parameters
+    ----------
+    maxsize : int, optional (default=32)
+       Number of layouts kept in memory.
+
+    directory : string, optional (default=None)
+       Directory for the on-disk tier. Created if missing.
+    """
+    def __init__(self, maxsize=32, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self._memory = OrderedDict()
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def layout(self, G, layout='spring', name=None, **kwargs):
+        """Return positions for G, computing them only on a cache miss.
+
+        Takes the same arguments as ``compute_layout``. A callable layout
+        is keyed by its module and qualified name, or by ``name`` when
+        given; lambdas, closures and partials need a ``name``.
+        """
+        key = graph_fingerprint(G, layout=_layout_name(layout, name), **kwargs)
+        pos = self.get(key)
+        if pos is None:
+            pos = compute_layout(G, layout, **kwargs)
+            self.put(key, pos)
+        return pos
+
+    def get(self, key):
+        """Positions stored under ``key``, or None."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+        if self.directory is not None:
+            path = os.path.join(self.directory, key)
+            if os.path.exists(path + '.npy') and os.path.exists(path + '.nodes'):
+                xy = np.load(path + '.npy', mmap_mode='r')
+                with open(path + '.nodes', 'rb') as f:
+                    nodes = pickle.load(f)
+                pos = Positions(xy, nodes)
+                self._remember(key, pos)
+                return pos
+        return None
+
+    def put(self, key, pos):
+        """Store positions under ``key`` in every tier."""
+        self._remember(key, pos)
+
+        if self.directory is not None:
+            if isinstance(pos, Positions):
+                nodes, xy = list(pos.node_index), pos.xy
+            else:
+                nodes = list(pos)
+                xy = np.array([pos[n] for n in nodes], dtype=float).reshape(len(nodes), 2)
+            path = os.path.join(self.directory, key)
+            self._write(path + '.npy', lambda f: np.save(f, xy))
+            self._write(path + '.nodes', lambda f: pickle.dump(nodes, f))
+
+    def clear(self):
+        """Empty the in-memory tier. Files on disk are kept."""
+        self._memory.clear()
+
+    def _remember(self, key, pos):
+        self._memory[key] = pos
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _write(self, path, write):
+        # Write to a temporary file first, so readers never see half a file.
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp, path)
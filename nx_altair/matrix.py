@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+from .core import _edge_index
+from .arraygraph import ArrayGraph
+from .bundling import community_labels
+
+
+def _rcm(n, src, dst):
+    """Reverse Cuthill-McKee permutation with SciPy, or None without it."""
+    try:
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import reverse_cuthill_mckee
+    except ImportError:
+        return None
+
+    A = coo_matrix((np.ones(len(src)), (src, dst)), shape=(n, n)).tocsr()
+    return reverse_cuthill_mckee((A + A.T).tocsr(), symmetric_mode=True)
+
+
+def node_order(G, order='degree', weight='weight', communities=None,
+               seed=None):
+    """Order the nodes of G for an adjacency matrix.
+
+    Parameters
+    ----------
+    G : graph
+       A networkx graph
+
+    order : string or list, optional (default='degree')
+       'degree' sorts nodes by decreasing weighted degree; 'rcm' uses the
+       reverse Cuthill-McKee ordering, which pulls non-zero cells toward
+       the diagonal (with SciPy when it is installed, otherwise with
+       networkx); 'community' groups nodes by community, each by
+       decreasing degree. None keeps the order of G and a list is used
+       as given.
+
+    weight : string, optional (default='weight')
+       Edge attribute used as weight; missing weights count as 1.
+
+    communities : dict or list of sets, optional
+       Communities for order='community', see
+       ``bundling.community_labels`` (default=None, detected from G).
+
+    seed : int, optional (default=None)
+       Seed for community detection.
+
+    Returns
+    -------
+    nodes : list
+       Every node of G, in matrix order.
+    """
+    nodes = list(G.nodes())
+    if order is None:
+        return nodes
+
+    elif not isinstance(order, str):
+        return list(order)
+
+    src, dst, w = _edge_index(G, nodes, weight=weight)
+    degree = (np.bincount(src, weights=w, minlength=len(nodes))
+              + np.bincount(dst, weights=w, minlength=len(nodes)))
+
+    if order == 'degree':
+        perm = np.argsort(-degree, kind='stable')
+
+    elif order == 'community':
+        labels = community_labels(G, communities, weight=weight, seed=seed)
+        codes = np.array([labels[n] for n in nodes], dtype=np.int64)
+        perm = np.lexsort((-degree, codes))
+
+    elif order == 'rcm':
+        perm = _rcm(len(nodes), src, dst)
+        if perm is None:
+            if isinstance(G, ArrayGraph):
+                G = G.to_networkx()
+            return list(nx.utils.reverse_cuthill_mckee_ordering(
+                G.to_undirected(as_view=True)))
+
+    else:
+        raise Exception("order must be 'degree', 'rcm', 'community', a list or None.")
+
+    return [nodes[i] for i in perm]
+
+
+def to_pandas_adjacency(G, nodes=None, weight='weight', max_cells=None):
+    """Non-zero cells of the adjacency matrix of G as a DataFrame.
+
+    Rows and columns follow ``nodes``. The matrix is built in COO form
+    from the edge arrays, with both directions of every undirected edge,
+    so the table grows with the number of edges and not with the square
+    of the number of nodes.
+
+    With ``max_cells``, consecutive rows and columns are merged into
+    square blocks, so that the matrix has at most ``max_cells`` cells
+    whatever the size of G.
+
+    Parameters
+    ----------
+    G : graph
+       A networkx graph
+
+    nodes : list, optional
+       Every node of G in matrix order, see ``node_order``
+       (default=None, the order of G).
+
+    weight : string, optional (default='weight')
+       Edge attribute to sum per cell; missing weights count as 1.
+
+    max_cells : int, optional (default=None)
+       Upper bound on the number of cells.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+       One row per non-empty cell, spanning rows y to y2 and columns x
+       to x2, with the summed weight and the number of edges as count.
+       Without blocks, the source (row) and target (column) nodes are
+       included too.
+    """
+    nodes = list(G.nodes()) if nodes is None else list(nodes)
+    n = len(nodes)
+    src, dst, w = _edge_index(G, nodes, weight=weight)
+    if not G.is_directed():
+        loop = src == dst
+        src, dst = (np.concatenate([src, dst[~loop]]),
+                    np.concatenate([dst, src[~loop]]))
+        w = np.concatenate([w, w[~loop]])
+
+    block = 1
+    if max_cells is not None:
+        side = max(1, int(np.sqrt(max_cells)))
+        block = max(1, -(-n // side))
+    side = -(-n // block)
+
+    cells, inverse = np.unique(
+        (src // block) * side + dst // block, return_inverse=True)
+    row, col = cells // max(side, 1), cells % max(side, 1)
+
+    columns = dict(
+        x=col * block,
+        x2=np.minimum((col + 1) * block, n),
+        y=row * block,
+        y2=np.minimum((row + 1) * block, n),
+        weight=np.bincount(inverse, weights=w, minlength=len(cells)),
+        count=np.bincount(inverse, minlength=len(cells)),
+    )
+    if block == 1:
+        labels = np.empty(n, dtype=object)
+        labels[:] = nodes
+        columns.update(source=labels[row], target=labels[col])
+    return pd.DataFrame(columns)
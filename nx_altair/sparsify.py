@@ -0,0 +1,144 @@
+import numpy as np
+
+from .core import _select_edges
+
+
+def _incidence(G, edgelist, weight):
+    """Edges of G with their weights, and their incidence on nodes in CSR
+    order.
+
+    Every edge is listed under both of its end points. Incidences are
+    sorted by node, so ``indptr[i]:indptr[i + 1]`` spans the edges of the
+    i-th node, as in a CSR adjacency matrix.
+
+    Returns
+    -------
+    edges : list
+       (u, v) tuples, one per edge of G (parallel edges included).
+
+    w : numpy array
+       Weight of each edge; missing weights count as 1.
+
+    node, edge : numpy arrays
+       Node index and edge index of each incidence, sorted by node.
+
+    indptr : numpy array
+       Start of each node's incidences.
+    """
+    edges, w = [], []
+    for u, v, attrs in _select_edges(G, edgelist):
+        edges.append((u, v))
+        w.append(attrs.get(weight, 1))
+    w = np.asarray(w, dtype=float)
+
+    index = {}
+    source = np.array([index.setdefault(u, len(index)) for u, v in edges],
+                      dtype=np.int64)
+    target = np.array([index.setdefault(v, len(index)) for u, v in edges],
+                      dtype=np.int64)
+
+    node = np.concatenate([source, target])
+    edge = np.tile(np.arange(len(edges)), 2)
+    order = np.argsort(node, kind='stable')
+    node, edge = node[order], edge[order]
+    degree = np.bincount(node, minlength=len(index))
+    indptr = np.concatenate([[0], np.cumsum(degree)])
+    return edges, w, node, edge, indptr
+
+
+def _top_k_mask(node, edge, indptr, w, k):
+    """Keep the edges ranked in the ``k`` heaviest at either end point."""
+    # Sort each node's incidences by decreasing weight; the rank of an
+    # incidence is its offset from the start of its node's run.
+    order = np.lexsort((-w[edge], node))
+    rank = np.arange(len(order)) - indptr[node[order]]
+
+    keep = np.zeros(len(w), dtype=bool)
+    keep[edge[order][rank < k]] = True
+    return keep
+
+
+def _disparity_mask(node, edge, indptr, w, alpha):
+    """Keep the edges that the disparity filter finds significant at
+    either end point.
+
+    The weights of a node with degree k are compared to a uniform split of
+    its strength s, and an edge is significant at that node when
+    ``(1 - w / s) ** (k - 1) < alpha``. Nodes of degree one cannot make
+    an edge significant.
+    """
+    degree = np.diff(indptr)
+    strength = np.bincount(node, weights=w[edge], minlength=len(degree))
+
+    k = degree[node]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = w[edge] / strength[node]
+    significance = np.where(k > 1, (1 - p) ** (k - 1), 1.)
+
+    keep = np.zeros(len(w), dtype=bool)
+    keep[edge[significance < alpha]] = True
+    return keep
+
+
+def sparsify_edges(G, method='top_k', edgelist=None, weight='weight',
+                   k=5, threshold=None, alpha=0.05):
+    """Select the visually important edges of a dense weighted graph.
+
+    Scores are computed with NumPy over the incidences of all edges,
+    grouped by node as in a CSR adjacency matrix.
+
+    Parameters
+    ----------
+    G : graph
+       A networkx graph
+
+    method : 'top_k', 'threshold' or 'backbone', optional (default='top_k')
+       'top_k' keeps each node's ``k`` heaviest edges; 'threshold' keeps
+       edges with a weight of at least ``threshold``; 'backbone' keeps the
+       edges that pass the disparity filter at level ``alpha``.
+
+    edgelist : list, optional
+       Select among these edges only (default=None, all edges of G)
+
+    weight : string, optional (default='weight')
+       Edge attribute to score edges by. Missing weights count as 1.
+
+    k : int, optional (default=5)
+       Edges to keep per node for 'top_k'.
+
+    threshold : float, optional (default=None)
+       Smallest weight to keep for 'threshold'.
+
+    alpha : float, optional (default=0.05)
+       Significance level for 'backbone'.
+
+    Returns
+    -------
+    edgelist : list
+       (u, v) tuples of the kept edges, in the order of G.edges().
+
+    dropped : int
+       Number of edges left out.
+    """
+    edges, w, node, edge, indptr = _incidence(G, edgelist, weight)
+
+    if method == 'top_k':
+        keep = _top_k_mask(node, edge, indptr, w, k)
+    elif method == 'threshold':
+        if threshold is None:
+            raise Exception("method='threshold' needs a threshold.")
+        keep = w >= threshold
+    elif method == 'backbone':
+        keep = _disparity_mask(node, edge, indptr, w, alpha)
+    else:
+        raise Exception("method must be 'top_k', 'threshold' or 'backbone'.")
+
+    if not G.is_multigraph():
+        kept = [e for e, keep_edge in zip(edges, keep) if keep_edge]
+        return kept, len(edges) - len(kept)
+
+    # Parallel edges are drawn together, so a pair stays if any edge of it
+    # is kept.
+    kept = dict.fromkeys(e for e, keep_edge in zip(edges, keep) if keep_edge)
+    dropped = sum(1 for e in edges if e not in kept)
+    return list(kept), dropped
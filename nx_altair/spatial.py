@@ -0,0 +1,225 @@
+import numpy as np
+
+from .arraygraph import ArrayGraph, node_positions
+
+
+def _check_viewport(viewport):
+    """Return ``viewport`` as floats (xmin, xmax, ymin, ymax)."""
+    try:
+        xmin, xmax, ymin, ymax = [float(v) for v in viewport]
+    except (TypeError, ValueError):
+        raise Exception("viewport must be a tuple (xmin, xmax, ymin, ymax).")
+
+    if xmax < xmin or ymax < ymin:
+        raise Exception("viewport must satisfy xmin <= xmax and ymin <= ymax.")
+    return xmin, xmax, ymin, ymax
+
+
+def clip_segments(x, y, x2, y2, viewport):
+    """Clip the segments (x, y)-(x2, y2) to a box with the Liang-Barsky
+    algorithm, vectorized over all segments.
+
+    Returns
+    -------
+    inside : numpy array of bools
+       Whether any part of each segment, end points included, lies in the
+       box.
+
+    t0, t1 : numpy arrays
+       Fractions along each segment where its part inside the box starts
+       and ends; only meaningful where ``inside`` is True.
+    """
+    xmin, xmax, ymin, ymax = _check_viewport(viewport)
+    x, y, x2, y2 = [np.asarray(a, dtype=float) for a in (x, y, x2, y2)]
+    dx = x2 - x
+    dy = y2 - y
+
+    t0 = np.zeros(len(x))
+    t1 = np.ones(len(x))
+    inside = np.ones(len(x), dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for p, q in ((-dx, x - xmin), (dx, xmax - x),
+                     (-dy, y - ymin), (dy, ymax - y)):
+            t = q / p
+            inside &= (p != 0) | (q >= 0)
+            t0 = np.where(p < 0, np.maximum(t0, t), t0)
+            t1 = np.where(p > 0, np.minimum(t1, t), t1)
+    return inside & (t0 <= t1), t0, t1
+
+
+def segments_in_box(x, y, x2, y2, viewport):
+    """Boolean mask of the segments (x, y)-(x2, y2) that cross the box,
+    see ``clip_segments``.
+    """
+    return clip_segments(x, y, x2, y2, viewport)[0]
+
+
+class SpatialIndex(object):
+    """Grid index over a layout for viewport queries.
+
+    Nodes are bucketed into a uniform grid of about one node per cell, so
+    a query only looks at the cells the viewport covers. Edges keep their
+    end points and bounding boxes as arrays; a query filters them by
+    bounding box and then clips the remaining segments against the
+    viewport. Build it once per layout and query it for every zoomed view.
+
+    Parameters
+    ----------
+    G : graph
+       A networkx graph
+
+    pos : dictionary
+       A dictionary with nodes as keys and positions as values.
+
+    cells : int, optional (default=None)
+       Number of grid cells along each axis. Defaults to the square root
+       of the number of nodes.
+    """
+    def __init__(self, G, pos, cells=None):
+        self.nodes = list(G.nodes())
+        self.xy = node_positions(G, pos)
+
+        # ---------- Node grid ------------
+        if cells is None:
+            cells = int(np.sqrt(len(self.nodes))) or 1
+        self.cells = cells
+
+        if len(self.nodes):
+            lower = self.xy.min(axis=0)
+            upper = self.xy.max(axis=0)
+        else:
+            lower = upper = np.zeros(2)
+        self.lower = lower
+        self.cell_size = np.where(upper > lower, upper - lower, 1.) / cells
+
+        cell = self._cell(self.xy)
+        cell_id = cell[:, 0] * cells + cell[:, 1]
+        self.order = np.argsort(cell_id, kind='stable')
+        self.cell_start = np.searchsorted(
+            cell_id[self.order], np.arange(cells * cells + 1))
+
+        # ---------- Edge end points ------------
+        self.edges = list(G.edges())
+        if isinstance(G, ArrayGraph):
+            source, target = G.source, G.target
+        else:
+            index = {n: i for i, n in enumerate(self.nodes)}
+            source = np.array([index[u] for u, v in self.edges], dtype=np.int64)
+            target = np.array([index[v] for u, v in self.edges], dtype=np.int64)
+        self.source_xy = self.xy[source]
+        self.target_xy = self.xy[target]
+        self.edge_lower = np.minimum(self.source_xy, self.target_xy)
+        self.edge_upper = np.maximum(self.source_xy, self.target_xy)
+
+    def _cell(self, xy):
+        """Grid cell (column, row) of each point, clipped to the grid."""
+        cell = np.floor((xy - self.lower) / self.cell_size).astype(np.int64)
+        return np.clip(cell, 0, self.cells - 1)
+
+    def nodes_in(self, viewport):
+        """Nodes whose position lies inside the viewport.
+
+        Parameters
+        ----------
+        viewport : tuple
+           (xmin, xmax, ymin, ymax) of the box to query.
+
+        Returns
+        -------
+        nodes : list
+           Nodes in the box, in the order of G.nodes().
+        """
+        xmin, xmax, ymin, ymax = _check_viewport(viewport)
+        (i0, j0), (i1, j1) = self._cell(np.array([[xmin, ymin], [xmax, ymax]]))
+
+        # Candidate nodes from the covered cells; each column of the grid
+        # is one contiguous run of rows j0..j1.
+        candidates = np.concatenate([np.zeros(0, dtype=np.int64)] + [
+            self.order[self.cell_start[i * self.cells + j0]:
+                       self.cell_start[i * self.cells + j1 + 1]]
+            for i in range(i0, i1 + 1)
+        ])
+        xy = self.xy[candidates]
+        keep = ((xy[:, 0] >= xmin) & (xy[:, 0] <= xmax) &
+                (xy[:, 1] >= ymin) & (xy[:, 1] <= ymax))
+        return [self.nodes[i] for i in np.sort(candidates[keep])]
+
+    def edges_in(self, viewport):
+        """Edges whose straight segment crosses the viewport.
+
+        Parameters
+        ----------
+        viewport : tuple
+           (xmin, xmax, ymin, ymax) of the box to query.
+
+        Returns
+        -------
+        edges : list
+           (u, v) tuples of the edges in the box, in the order of G.edges().
+        """
+        xmin, xmax, ymin, ymax = _check_viewport(viewport)
+        candidates = np.flatnonzero(
+            (self.edge_lower[:, 0] <= xmax) & (self.edge_upper[:, 0] >= xmin) &
+            (self.edge_lower[:, 1] <= ymax) & (self.edge_upper[:, 1] >= ymin))
+
+        source_xy = self.source_xy[candidates]
+        target_xy = self.target_xy[candidates]
+        keep = segments_in_box(
+            source_xy[:, 0], source_xy[:, 1],
+            target_xy[:, 0], target_xy[:, 1],
+            (xmin, xmax, ymin, ymax))
+        return [self.edges[i] for i in candidates[keep]]
+
+
+def cull(G, pos, viewport, nodelist=None, edgelist=None, index=None):
+    """Restrict node and edge lists to a viewport.
+
+    Parameters
+    ----------
+    G : graph
+       A networkx graph
+
+    pos : dictionary
+       A dictionary with nodes as keys and positions as values.
+
+    viewport : tuple
+       (xmin, xmax, ymin, ymax) of the box to keep.
+
+    nodelist, edgelist : list, optional
+       Candidate nodes and edges (default=None, all of G). Given lists are
+       filtered directly; otherwise the whole graph is queried through
+       ``index``.
+
+    index : SpatialIndex, optional
+       Index over G and pos to reuse across queries (default=None, built
+       here when needed).
+
+    Returns
+    -------
+    nodelist, edgelist : list
+       Nodes inside the viewport and edges whose segments cross it.
+    """
+    viewport = _check_viewport(viewport)
+    if index is None and (nodelist is None or edgelist is None):
+        index = SpatialIndex(G, pos)
+
+    if nodelist is None:
+        nodelist = index.nodes_in(viewport)
+    else:
+        xmin, xmax, ymin, ymax = viewport
+        xy = node_positions(G, pos, nodelist)
+        keep = ((xy[:, 0] >= xmin) & (xy[:, 0] <= xmax) &
+                (xy[:, 1] >= ymin) & (xy[:, 1] <= ymax))
+        nodelist = [n for n, k in zip(nodelist, keep) if k]
+
+    if edgelist is None:
+        edgelist = index.edges_in(viewport)
+    else:
+        source_xy = node_positions(G, pos, [e[0] for e in edgelist])
+        target_xy = node_positions(G, pos, [e[1] for e in edgelist])
+        keep = segments_in_box(
+            source_xy[:, 0], source_xy[:, 1],
+            target_xy[:, 0], target_xy[:, 1], viewport)
+        edgelist = [e for e, k in zip(edgelist, keep) if k]
+
+    return nodelist, edgelist
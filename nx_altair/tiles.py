@@ -0,0 +1,267 @@
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import altair as alt
+
+from .core import GraphFrame, density_grid, segment_density
+from .data import FORMATS, start_server
+from .spatial import SpatialIndex
+
+
+class TileServer(object):
+    """Serve the nodes and edges of a laid-out graph as map-style tiles.
+
+    The layout is covered by a square root tile at zoom level 0, and every
+    tile (z, x, y) splits into four tiles at level z + 1; x counts columns
+    from the left and y rows from the top. A tile holds the nodes inside it
+    and the edges crossing it, culled through a ``spatial.SpatialIndex``.
+    Layers with more elements than ``max_elements`` are sent as density
+    grids instead, see ``core.density_grid`` and ``core.segment_density``.
+
+    Serialized tiles are kept in an in-memory LRU cache, so panning back
+    over the same area does not rebuild them.
+
+    Parameters
+    ----------
+    G : graph
+       A networkx graph
+
+    pos : dictionary
+       A dictionary with nodes as keys and positions as values.
+
+    format : string, optional (default='json')
+       Tile format, one of the ``data.FORMATS``.
+
+    max_elements : int, optional (default=5000)
+       Element budget per layer and tile.
+
+    bins : int, optional (default=64)
+       Number of density cells along each axis of a tile.
+
+    cache_size : int, optional (default=256)
+       Number of tiles kept in memory.
+
+    index : SpatialIndex, optional
+       Index over G and pos to reuse (default=None, built here).
+    """
+    def __init__(self, G, pos, format='json', max_elements=5000, bins=64,
+                 cache_size=256, index=None):
+        if format not in FORMATS:
+            raise Exception("format must be one of {}.".format(
+                ", ".join(sorted(FORMATS))))
+
+        self.G = G
+        self.pos = pos
+        self.format = format
+        self.max_elements = max_elements
+        self.bins = bins
+        self.cache_size = cache_size
+        self.index = index if index is not None else SpatialIndex(G, pos)
+        self.server = None
+        self.url = None
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Square root tile around the layout.
+        if len(self.index.xy):
+            lower = self.index.xy.min(axis=0)
+            upper = self.index.xy.max(axis=0)
+        else:
+            lower = upper = np.zeros(2)
+        self.size = float(max(np.max(upper - lower), 1e-12))
+        self.origin = (lower + upper) / 2 - self.size / 2
+
+    def bounds(self, z, x, y):
+        """(xmin, xmax, ymin, ymax) covered by tile (z, x, y)."""
+        n = 2 ** z
+        if not (0 <= x < n and 0 <= y < n):
+            raise Exception("Tile ({}, {}, {}) is out of range.".format(z, x, y))
+
+        size = self.size / n
+        xmin = float(self.origin[0] + x * size)
+        ymax = float(self.origin[1] + (n - y) * size)
+        return xmin, xmin + size, ymax - size, ymax
+
+    def tile(self, z, x, y):
+        """Serialized layers of tile (z, x, y).
+
+        Returns
+        -------
+        tile : dict
+           'nodes' and 'edges' map to the serialized tables; 'density'
+           maps to the set of layers sent as density grids.
+        """
+        key = (z, x, y)
+        with self._lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+
+        tile = self._build(z, x, y)
+
+        with self._lock:
+            self._tiles[key] = tile
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.cache_size:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def _build(self, z, x, y):
+        viewport = self.bounds(z, x, y)
+        nodelist = self.index.nodes_in(viewport)
+        edgelist = self.index.edges_in(viewport)
+        frame = GraphFrame(
+            self.G, self.pos,
+            nodelist=nodelist,
+            edgelist=edgelist,
+            node_key='node',
+            node_attributes=(),
+            edge_attributes=()
+        )
+
+        density = set()
+        if len(nodelist) > self.max_elements:
+            df = frame.nodes
+            nodes = density_grid(
+                df['x'], df['y'], bins=self.bins, extent=viewport)
+            density.add('nodes')
+        else:
+            nodes = frame.nodes
+
+        if len(edgelist) > self.max_elements:
+            df = frame.segments
+            edges = segment_density(
+                df['x'], df['y'], df['x2'], df['y2'],
+                bins=self.bins, extent=viewport)
+            density.add('edges')
+        else:
+            edges = frame.segments.drop(columns='pair')
+
+        serialize = FORMATS[self.format][0]
+        return dict(
+            nodes=serialize(nodes),
+            edges=serialize(edges),
+            density=density
+        )
+
+    def clear(self):
+        """Empty the tile cache."""
+        with self._lock:
+            self._tiles.clear()
+
+    def tile_url(self, z, x, y, layer):
+        """URL of one layer of tile (z, x, y); needs a running server."""
+        if self.url is None:
+            raise Exception("Start the server with serve() first.")
+
+        extension = FORMATS[self.format][1]
+        return '{}tiles/{}/{}/{}/{}.{}'.format(
+            self.url, z, x, y, layer, extension)
+
+    def spec(self, z, x, y):
+        """Chart of tile (z, x, y) that loads its data from the server.
+
+        Each layer is drawn with individual marks, or as a heatmap when the
+        tile sends it as a density grid, and the scales are fixed to the
+        tile bounds.
+        """
+        xmin, xmax, ymin, ymax = self.bounds(z, x, y)
+        density = self.tile(z, x, y)['density']
+        data_format = alt.DataFormat(type=FORMATS[self.format][2])
+        axis = alt.Axis(title='', grid=False, labels=False, ticks=False)
+        x_enc = alt.X('x:Q', axis=axis, scale=alt.Scale(domain=[xmin, xmax]))
+        y_enc = alt.Y('y:Q', axis=axis, scale=alt.Scale(domain=[ymin, ymax]))
+
+        layers = []
+        for layer in ('edges', 'nodes'):
+            chart = alt.Chart(alt.UrlData(
+                url=self.tile_url(z, x, y, layer), format=data_format))
+
+            if layer in density:
+                chart = chart.mark_rect(clip=True).encode(
+                    x=x_enc, y=y_enc, x2='x2:Q', y2='y2:Q',
+                    color=alt.Color(
+                        'count:Q',
+                        scale=alt.Scale(
+                            scheme='greys' if layer == 'edges' else 'blues',
+                            type='log'),
+                        legend=None)
+                )
+            elif layer == 'edges':
+                chart = chart.mark_rule(clip=True, color='black').encode(
+                    x=x_enc, y=y_enc, x2='x2:Q', y2='y2:Q')
+            else:
+                chart = chart.mark_point(
+                    clip=True, filled=True, color='red', opacity=1
+                ).encode(x=x_enc, y=y_enc)
+            layers.append(chart)
+
+        return alt.layer(*layers).resolve_scale(color='independent')
+
+    def serve(self, host='127.0.0.1', port=0):
+        """Answer tile requests over HTTP from a background thread.
+
+        Routes are ``tiles/{z}/{x}/{y}/nodes.{ext}``,
+        ``tiles/{z}/{x}/{y}/edges.{ext}`` and ``spec/{z}/{x}/{y}.json``
+        relative to ``url``.
+        """
+        server = ThreadingHTTPServer((host, port), _TileRequestHandler)
+        server.tiles = self
+        self.server = start_server(server)
+        self.url = self.server.url
+        return self
+
+    def close(self):
+        """Stop the server, if one was started."""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            self.url = None
+
+
+class _TileRequestHandler(BaseHTTPRequestHandler):
+    """Answers the routes of ``TileServer.serve``."""
+    content_types = {
+        'csv': 'text/csv',
+        'tsv': 'text/tab-separated-values',
+        'json': 'application/json',
+        'arrow': 'application/vnd.apache.arrow.file',
+    }
+
+    def do_GET(self):
+        tiles = self.server.tiles
+        parts = self.path.split('?')[0].strip('/').split('/')
+        try:
+            if len(parts) == 5 and parts[0] == 'tiles':
+                layer, extension = parts[4].rsplit('.', 1)
+                z, x, y = [int(p) for p in parts[1:4]]
+                if layer not in ('nodes', 'edges'):
+                    raise ValueError(layer)
+                body = tiles.tile(z, x, y)[layer]
+                content_type = self.content_types[tiles.format]
+
+            elif len(parts) == 4 and parts[0] == 'spec':
+                z, x, y = [int(p) for p in parts[1:3] + [parts[3].split('.')[0]]]
+                body = json.dumps(tiles.spec(z, x, y).to_dict()).encode('utf-8')
+                content_type = 'application/json'
+
+            else:
+                raise ValueError(self.path)
+
+        except Exception:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
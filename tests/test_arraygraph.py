@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+import nx_altair as nxa
+from nx_altair.arraygraph import as_graph, as_positions, node_positions
+from nx_altair.bundling import community_labels
+from nx_altair.sparsify import sparsify_edges
+
+
+G = nx.karate_club_graph()
+EDGES = np.array(G.edges())
+
+
+def test_array_edges_have_empty_attributes():
+    A = as_graph(EDGES)
+    assert len(A.edges(data=True)) == G.number_of_edges()
+    assert all(d == {} for _, _, d in A.edges(data=True))
+    assert all(d == {} for _, d in A.nodes(data=True))
+
+
+def test_to_networkx_without_attributes():
+    H = as_graph(EDGES).to_networkx()
+    assert H.number_of_nodes() == G.number_of_nodes()
+    assert H.number_of_edges() == G.number_of_edges()
+
+
+def test_to_networkx_keeps_isolated_nodes():
+    H = as_graph(EDGES, nodes=range(40)).to_networkx()
+    assert H.number_of_nodes() == 40
+
+
+def test_draw_attributeless_inputs():
+    df = pd.DataFrame(EDGES, columns=['source', 'target'])
+    for data in (EDGES, df):
+        nxa.draw_networkx(data).to_dict()
+
+
+def test_sparsify_attributeless_array():
+    kept, dropped = sparsify_edges(as_graph(EDGES), 'top_k')
+    assert len(kept) + dropped == G.number_of_edges()
+    assert len(kept) > 0
+
+
+def test_community_labels_attributeless_array():
+    labels = community_labels(as_graph(EDGES), seed=0)
+    assert len(labels) == G.number_of_nodes()
+    nxa.draw_networkx(EDGES, edge_bundling='community').to_dict()
+
+
+def test_aligned_positions_follow_graph_changes():
+    H = nx.path_graph(5)
+    pos = as_positions({n: (n, 0) for n in H})
+    assert list(node_positions(H, pos)[:, 0]) == [0, 1, 2, 3, 4]
+    H.remove_node(0)
+    H.add_node(0)
+    assert list(node_positions(H, pos)[:, 0]) == [1, 2, 3, 4, 0]
@@ -0,0 +1,19 @@
+import networkx as nx
+import pytest
+
+import nx_altair as nxa
+
+
+def test_bundles_refuse_partial_communities():
+    G = nx.complete_graph(6)
+    pos = nx.circular_layout(G)
+    with pytest.raises(Exception):
+        nxa.draw_networkx_bundles(G, pos, communities=[{0, 1, 2}, {3, 4}])
+    nxa.draw_networkx_bundles(G, pos, communities=[{0, 1, 2}, {3, 4, 5}]).to_dict()
+
+
+def test_bundles_with_tuple_node_ids():
+    G = nx.grid_2d_graph(4, 4)
+    pos = {n: n for n in G}
+    communities = [{n for n in G if n[0] < 2}, {n for n in G if n[0] >= 2}]
+    nxa.draw_networkx_bundles(G, pos, communities=communities).to_dict()
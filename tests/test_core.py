@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+import nx_altair as nxa
+from nx_altair.core import compact_frame, segment_density
+
+
+def test_segment_density_hits_every_cell_of_a_full_width_segment():
+    df = segment_density([0.0], [0.5], [1.0], [0.5], bins=10,
+                         extent=(0, 1, 0, 1))
+    assert len(df) == 10
+    assert (df['count'] == 1).all()
+
+
+def test_segment_density_hits_every_cell_of_the_diagonal():
+    df = segment_density([0.0], [0.0], [1.0], [1.0], bins=10,
+                         extent=(0, 1, 0, 1))
+    assert len(df) == 10
+
+
+def test_draw_edges_with_empty_edgelist():
+    G = nx.path_graph(4)
+    pos = nx.spring_layout(G, seed=0)
+    chart = nxa.draw_networkx(G, pos)
+    nxa.draw_networkx_edges(G, pos, chart=chart, edgelist=[]).to_dict()
+
+
+def test_compact_frame_keeps_float_attributes_exact():
+    df = pd.DataFrame({'x': [0.1, 0.2], 'w': [0.1, 0.3], 'h': [0.5, 2.0]})
+    compact = compact_frame(df)
+    assert compact['w'].dtype == np.float64
+    assert compact['w'].tolist() == [0.1, 0.3]
+    assert compact['h'].dtype == np.float32
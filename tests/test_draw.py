@@ -0,0 +1,39 @@
+import networkx as nx
+
+import nx_altair as nxa
+
+
+def test_viewport_fixes_scales_and_clips():
+    G = nx.random_geometric_graph(300, 0.1, seed=1)
+    pos = nx.get_node_attributes(G, 'pos')
+    chart = nxa.draw_networkx(G, pos, viewport=(0.4, 0.5, 0.4, 0.5)).to_dict()
+    for layer in chart['layer']:
+        assert layer['mark']['clip'] is True
+        assert layer['encoding']['x']['scale'] == {'domain': [0.4, 0.5]}
+        assert layer['encoding']['y']['scale'] == {'domain': [0.4, 0.5]}
+
+
+def test_viewport_density_grids_span_the_viewport():
+    G = nx.random_geometric_graph(3000, 0.03, seed=1)
+    pos = nx.get_node_attributes(G, 'pos')
+    chart = nxa.draw_networkx(
+        G, pos, viewport=(0.4, 0.5, 0.4, 0.5), max_elements=10,
+        density_bins=64).to_dict()
+    for rows in chart['datasets'].values():
+        for row in rows:
+            assert 0.4 <= row['x'] and row['x2'] <= 0.5
+            assert abs(row['x2'] - row['x'] - 0.1 / 64) < 1e-9
+
+
+def test_lookup_joins_on_integer_codes_for_tuple_ids():
+    G = nx.grid_2d_graph(3, 3)
+    chart = nxa.draw_networkx(G, edge_format='lookup').to_dict()
+    lookups = [t for layer in chart['layer']
+               for t in layer.get('transform', []) if 'lookup' in t]
+    assert lookups
+    for t in lookups:
+        assert t['lookup'] in ('source_code', 'target_code')
+        assert t['from']['key'] == 'node_code'
+    for rows in chart['datasets'].values():
+        for key in ('node_code', 'source_code', 'target_code'):
+            assert all(isinstance(row[key], int) for row in rows if key in row)
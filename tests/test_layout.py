@@ -0,0 +1,39 @@
+import functools
+
+import networkx as nx
+import pytest
+
+from nx_altair.arraygraph import Positions, as_positions
+from nx_altair.layout import LayoutCache, incremental_layout
+
+
+def test_layout_cache_keeps_named_callables_apart():
+    G = nx.complete_graph(5)
+    cache = LayoutCache()
+    circular = cache.layout(G, lambda G: nx.circular_layout(G), name='circular')
+    random = cache.layout(
+        G, lambda G: nx.random_layout(G, seed=3), name='random')
+    assert any((circular[n] != random[n]).any() for n in G)
+
+
+def test_layout_cache_refuses_unnamed_lambdas_and_partials():
+    G = nx.complete_graph(5)
+    cache = LayoutCache()
+    with pytest.raises(Exception):
+        cache.layout(G, lambda G: nx.circular_layout(G))
+    with pytest.raises(Exception):
+        cache.layout(G, functools.partial(nx.random_layout, seed=3))
+    cache.layout(G, nx.circular_layout)
+
+
+def test_incremental_layout_moves_only_the_change():
+    G = nx.path_graph(50)
+    pos = {n: (float(n), 0.0) for n in G}
+    G.add_edge(49, 'new')
+    out = incremental_layout(G, pos, seed=0)
+    assert set(out) == set(G)
+    assert all(tuple(out[n]) == pos[n] for n in range(47))
+
+    positions = incremental_layout(G, as_positions(pos), seed=0)
+    assert isinstance(positions, Positions)
+    assert all((positions[n] == out[n]).all() for n in G)
@@ -0,0 +1,64 @@
+import io
+
+import networkx as nx
+import pandas as pd
+import pytest
+
+from nx_altair.core import iter_pandas_nodes, iter_pandas_edges
+from nx_altair.data import _write_csv_chunks, _write_parquet_chunks
+
+
+def graph():
+    G = nx.path_graph(6)
+    G.nodes[0]['a'] = 'x'
+    G.nodes[5]['b'] = 'z'
+    G.edges[0, 1]['w'] = 1.0
+    G.edges[4, 5]['c'] = 'q'
+    pos = {n: (n, 0) for n in G}
+    return G, pos
+
+
+def test_chunks_share_columns():
+    G, pos = graph()
+    nodes = list(iter_pandas_nodes(G, pos, chunksize=2))
+    edges = list(iter_pandas_edges(G, pos, chunksize=2))
+    assert all(list(df.columns) == ['node', 'x', 'y', 'a', 'b'] for df in nodes)
+    assert len(set(tuple(df.columns) for df in edges)) == 1
+
+
+def test_csv_chunks_keep_attributes_in_place():
+    G, pos = graph()
+    f = io.BytesIO()
+    _write_csv_chunks(iter_pandas_nodes(G, pos, chunksize=2), f)
+    df = pd.read_csv(io.BytesIO(f.getvalue())).set_index('node')
+    assert df.loc[5, 'b'] == 'z' and pd.isna(df.loc[5, 'a'])
+
+    f = io.BytesIO()
+    _write_csv_chunks(
+        iter_pandas_edges(G, pos, chunksize=2, edge_format='rules'), f)
+    df = pd.read_csv(io.BytesIO(f.getvalue())).set_index('edge')
+    assert df.loc[4, 'c'] == 'q' and pd.isna(df.loc[4, 'w'])
+
+
+def test_parquet_chunks_keep_late_columns():
+    pytest.importorskip('pyarrow')
+    G, pos = graph()
+    f = io.BytesIO()
+    _write_parquet_chunks(iter_pandas_nodes(G, pos, chunksize=1), f)
+    df = pd.read_parquet(io.BytesIO(f.getvalue())).set_index('node')
+    assert df.loc[0, 'a'] == 'x' and df.loc[5, 'b'] == 'z'
+
+
+def test_parquet_chunks_widen_mixed_numbers():
+    pytest.importorskip('pyarrow')
+    G = nx.path_graph(6)
+    for i, (u, v) in enumerate(G.edges()):
+        if i < 3:
+            G.edges[u, v]['w'] = 1
+    G.edges[4, 5]['w'] = 0.5
+    pos = {n: (n, 0) for n in G}
+    f = io.BytesIO()
+    _write_parquet_chunks(iter_pandas_edges(G, pos, chunksize=2), f)
+    df = pd.read_parquet(io.BytesIO(f.getvalue()))
+    w = df.groupby('edge')['w'].first()
+    assert w[0] == 1 and w[4] == 0.5 and pd.isna(w[3])